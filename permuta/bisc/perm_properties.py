@@ -6,38 +6,42 @@ from permuta.patterns.perm import Perm
 from permuta.permutils.groups import dihedral_group
 
 _SMOOTH_PATT = (Perm((0, 2, 1, 3)), Perm((1, 0, 3, 2)))
+_SMOOTH_MATCHERS = tuple(patt.compile() for patt in _SMOOTH_PATT)
 
 
 def smooth(perm: Perm) -> bool:
     """Returns true if the perm is smooth, i.e. 0213- and 1032-avoiding."""
-    return perm.avoids(*_SMOOTH_PATT)
+    return not any(matcher.contains(perm) for matcher in _SMOOTH_MATCHERS)
 
 
 _FOREST_LIKE_PATT = (Perm((0, 2, 1, 3)), MeshPatt(Perm((1, 0, 3, 2)), [(2, 2)]))
+_FOREST_LIKE_MATCHERS = tuple(patt.compile() for patt in _FOREST_LIKE_PATT)
 
 
 def forest_like(perm: Perm) -> bool:
     """Returns true if the perm is forest like."""
-    return perm.avoids(*_FOREST_LIKE_PATT)
+    return not any(matcher.contains(perm) for matcher in _FOREST_LIKE_MATCHERS)
 
 
 _BAXTER_PATT = (
     MeshPatt(Perm((1, 3, 0, 2)), [(2, 2)]),
     MeshPatt(Perm((2, 0, 3, 1)), [(2, 2)]),
 )
+_BAXTER_MATCHERS = tuple(patt.compile() for patt in _BAXTER_PATT)
 
 
 def baxter(perm: Perm) -> bool:
     """Returns true if the perm is a baxter permutation."""
-    return perm.avoids(*_BAXTER_PATT)
+    return not any(matcher.contains(perm) for matcher in _BAXTER_MATCHERS)
 
 
 _SIMSUN_PATT = MeshPatt(Perm((2, 1, 0)), [(1, 0), (1, 1), (2, 2)])
+_SIMSUN_MATCHER = _SIMSUN_PATT.compile()
 
 
 def simsun(perm: Perm) -> bool:
     """Returns true if the perm is a simsun permutation."""
-    return perm.avoids(_SIMSUN_PATT)
+    return _SIMSUN_MATCHER.avoided_by(perm)
 
 
 def dihedral(perm: Perm) -> bool:
@@ -98,22 +102,24 @@ _AV_231_AND_MESH_PATT = (
     Perm((1, 2, 0)),
     MeshPatt(Perm((0, 1, 5, 2, 3, 4)), [(1, 6), (4, 5), (4, 6)]),
 )
+_AV_231_AND_MESH_MATCHERS = tuple(patt.compile() for patt in _AV_231_AND_MESH_PATT)
 
 
 def av_231_and_mesh(perm: Perm) -> bool:
     """Check if perm avoids MeshPatt(Perm((0, 1, 5, 2, 3, 4)), [(1, 6), (4, 5), (4, 6)])
     and the classial pattern 231.
     """
-    return perm.avoids(*_AV_231_AND_MESH_PATT)
+    return not any(matcher.contains(perm) for matcher in _AV_231_AND_MESH_MATCHERS)
 
 
 _HARD_MESH_PATT = (
     MeshPatt(Perm((0, 1, 2)), [(0, 0), (1, 1), (2, 2), (3, 3)]),
     MeshPatt(Perm((0, 1, 2)), [(0, 3), (1, 2), (2, 1), (3, 0)]),
 )
+_HARD_MESH_MATCHERS = tuple(patt.compile() for patt in _HARD_MESH_PATT)
 
 
 def hard_mesh(perm: Perm) -> bool:
     """Check if perm avoids MeshPatt(Perm((0, 1, 2)), [(0, 0), (1, 1), (2, 2), (3, 3)])
     and MeshPatt(Perm((0, 1, 2)), [(0, 3), (1, 2), (2, 1), (3, 0)])."""
-    return perm.avoids(*_HARD_MESH_PATT)
+    return not any(matcher.contains(perm) for matcher in _HARD_MESH_MATCHERS)
@@ -22,7 +22,7 @@ def enumerate_class(args: argparse.Namespace) -> None:
     print(f"Enumerating {perm_class}. Press Ctrl+C to exit.")
     n = 0
     while True:
-        print(perm_class.count(n), end=", ", flush=True)
+        print(perm_class.count(n, args.count_only), end=", ", flush=True)
         n += 1
 
 
@@ -80,6 +80,12 @@ def get_parser() -> argparse.ArgumentParser:
     )
     count_parser.set_defaults(func=enumerate_class)
     count_parser.add_argument("basis", help=basis_str)
+    count_parser.add_argument(
+        "--count-only",
+        action="store_true",
+        help="Count without keeping the permutations of the class, which uses "
+        "little memory",
+    )
 
     # The insenc command
     insenc_parser: argparse.ArgumentParser = subparsers.add_parser(
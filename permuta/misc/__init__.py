@@ -1,4 +1,5 @@
 from .display import HTMLViewer
+from .fenwick_tree import FenwickTree
 from .union_find import UnionFind
 
 DIR_EAST = 0
@@ -9,6 +10,7 @@ DIR_NONE = -1
 DIRS = [DIR_EAST, DIR_NORTH, DIR_WEST, DIR_SOUTH]
 
 __all__ = [
+    "FenwickTree",
     "HTMLViewer",
     "UnionFind",
     "DIRS",
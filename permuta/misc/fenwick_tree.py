@@ -0,0 +1,56 @@
+from typing import Iterable
+
+
+class FenwickTree:
+    """A binary indexed tree over a list of integers, supporting point updates
+    and prefix sums in logarithmic time."""
+
+    def __init__(self, size: int) -> None:
+        """Creates a tree of size zeros."""
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_list(cls, values: Iterable[int]) -> "FenwickTree":
+        """Creates a tree holding the given values in linear time."""
+        tree = [0]
+        tree.extend(values)
+        size = len(tree)
+        for idx in range(1, size):
+            parent = idx + (idx & -idx)
+            if parent < size:
+                tree[parent] += tree[idx]
+        res = cls(0)
+        res._tree = tree
+        return res
+
+    def add(self, idx: int, delta: int = 1) -> None:
+        """Add delta to the element with index idx."""
+        tree, size = self._tree, len(self._tree)
+        idx += 1
+        while idx < size:
+            tree[idx] += delta
+            idx += idx & -idx
+
+    def prefix_sum(self, idx: int) -> int:
+        """Return the sum of the first idx elements."""
+        tree, res = self._tree, 0
+        while idx > 0:
+            res += tree[idx]
+            idx -= idx & -idx
+        return res
+
+    def find(self, k: int) -> int:
+        """Return the smallest index idx such that the sum of the first idx + 1
+        elements is larger than k. The elements must be non-negative."""
+        tree, size = self._tree, len(self._tree)
+        idx, step = 0, 1 << (size - 1).bit_length()
+        while step:
+            nxt = idx + step
+            if nxt < size and tree[nxt] <= k:
+                idx = nxt
+                k -= tree[nxt]
+            step >>= 1
+        return idx
+
+    def __len__(self) -> int:
+        return len(self._tree) - 1
@@ -2,10 +2,12 @@ from .bivincularpatt import BivincularPatt, CovincularPatt, VincularPatt
 from .meshpatt import MeshPatt
 from .patt import Patt
 from .perm import Perm
+from .perm_array import PermArray
 
 __all__ = [
     "Patt",
     "Perm",
+    "PermArray",
     "MeshPatt",
     "BivincularPatt",
     "VincularPatt",
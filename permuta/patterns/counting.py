@@ -0,0 +1,255 @@
+import itertools
+from typing import Dict, List, Optional, Sequence, Tuple, cast
+
+from permuta.misc import FenwickTree
+
+# The sums of products of band counts of a sweep, indexed by whether the two
+# fixed entries are increasing, then by the bands of the two free entries
+BandSums = List[List[List[int]]]
+
+
+def _left_smaller(text: Sequence[int]) -> List[int]:
+    """For each index the number of smaller elements to its left."""
+    tree = FenwickTree(len(text))
+    res = []
+    for val in text:
+        res.append(tree.prefix_sum(val))
+        tree.add(val)
+    return res
+
+
+def _count_increasing(text: Sequence[int], length: int) -> int:
+    """Count the increasing subsequences of the given length, extending the
+    counts one element at a time with a Fenwick tree per pass."""
+    if length == 0:
+        return 1
+    counts = [1] * len(text)
+    for _ in range(length - 1):
+        tree = FenwickTree(len(text))
+        extended = []
+        for val, count in zip(text, counts):
+            extended.append(tree.prefix_sum(val))
+            tree.add(val, count)
+        counts = extended
+    return sum(counts)
+
+
+def _three_pattern_counts(text: Sequence[int]) -> Dict[Tuple[int, ...], int]:
+    """The number of occurrences of each pattern of length 3, from the number of
+    smaller and larger elements on each side of every element."""
+    n = len(text)
+    inc = dec = low_rise = peak = high_fall = valley = 0
+    for idx, (val, left_smaller) in enumerate(zip(text, _left_smaller(text))):
+        left_larger = idx - left_smaller
+        right_smaller = val - left_smaller
+        right_larger = n - 1 - idx - right_smaller
+        inc += left_smaller * right_larger
+        dec += left_larger * right_smaller
+        low_rise += right_larger * (right_larger - 1) // 2
+        peak += left_smaller * right_smaller
+        high_fall += left_smaller * (left_smaller - 1) // 2
+        valley += left_larger * right_larger
+    # low_rise counts 012 and 021, peak counts 021 and 120,
+    # high_fall counts 012 and 102 and valley counts 102 and 201
+    return {
+        (0, 1, 2): inc,
+        (0, 2, 1): low_rise - inc,
+        (1, 0, 2): high_fall - inc,
+        (1, 2, 0): peak - (low_rise - inc),
+        (2, 0, 1): valley - (high_fall - inc),
+        (2, 1, 0): dec,
+    }
+
+
+def _band(val: int, first: int, second: int) -> int:
+    """The band of val relative to the two values first and second: 0 below
+    both, 1 between them and 2 above both."""
+    return (val > first) + (val > second)
+
+
+def _middle_band_sums(text: Sequence[int]) -> BandSums:
+    """Fix the entries at indices u < v as the middle two entries of an
+    occurrence. The first entry is then to the left of u and the last to the
+    right of v. For each pair, count the elements of each side in each band
+    of values cut out by text[u] and text[v], and sum up the products."""
+    # pylint: disable=too-many-locals
+    n = len(text)
+    left_smaller = _left_smaller(text)
+    sums = [[[0] * 3 for _ in range(3)] for _ in range(2)]
+    # prefix[w] is the number of elements left of u that are smaller than w
+    prefix = [0] * (n + 1)
+    for u, u_val in enumerate(text):
+        # The number of elements at or left of v that are smaller than u_val
+        running = left_smaller[u]
+        for v in range(u + 1, n):
+            v_val = text[v]
+            if v_val < u_val:
+                running += 1
+                cells = sums[0]
+                lo, hi = v_val, u_val
+                right_lo, right_hi = v_val - left_smaller[v], u_val - running
+            else:
+                cells = sums[1]
+                lo, hi = u_val, v_val
+                right_lo, right_hi = u_val - running, v_val - left_smaller[v]
+            left = (prefix[lo], prefix[hi] - prefix[lo], u - prefix[hi])
+            right = (right_lo, right_hi - right_lo, n - 1 - v - right_hi)
+            for row, left_count in zip(cells, left):
+                if left_count:
+                    row[0] += left_count * right[0]
+                    row[1] += left_count * right[1]
+                    row[2] += left_count * right[2]
+        for w in range(u_val + 1, n + 1):
+            prefix[w] += 1
+    return sums
+
+
+def _outer_band_sums(text: Sequence[int]) -> BandSums:
+    """Fix the entries at indices u < v as the first and third entries of an
+    occurrence. The second entry is then between u and v and the last to the
+    right of v. Band counts are summed up as in _middle_band_sums."""
+    # pylint: disable=too-many-locals
+    n = len(text)
+    left_smaller = _left_smaller(text)
+    sums = [[[0] * 3 for _ in range(3)] for _ in range(2)]
+    # prefix[w] is the number of elements at or left of u that are smaller than w
+    prefix = [0] * (n + 1)
+    for u, u_val in enumerate(text):
+        for w in range(u_val + 1, n + 1):
+            prefix[w] += 1
+        # The number of elements left of v that are smaller than u_val
+        running = left_smaller[u]
+        for v in range(u + 1, n):
+            v_val = text[v]
+            mid_u, mid_v = running - left_smaller[u], left_smaller[v] - prefix[v_val]
+            if v_val < u_val:
+                running += 1
+                cells = sums[0]
+                mid_lo, mid_hi = mid_v, mid_u
+                right_lo, right_hi = v_val - left_smaller[v], u_val - running
+            else:
+                cells = sums[1]
+                mid_lo, mid_hi = mid_u, mid_v
+                right_lo, right_hi = u_val - running, v_val - left_smaller[v]
+            middle = (mid_lo, mid_hi - mid_lo, v - u - 1 - mid_hi)
+            right = (right_lo, right_hi - right_lo, n - 1 - v - right_hi)
+            for row, middle_count in zip(cells, middle):
+                if middle_count:
+                    row[0] += middle_count * right[0]
+                    row[1] += middle_count * right[1]
+                    row[2] += middle_count * right[2]
+    return sums
+
+
+class _FourPatternCounter:
+    """Counts occurrences of patterns of length 4 in a text from the band sums
+    of sweeps over pairs of entries, each computed at most once."""
+
+    # pylint: disable=too-few-public-methods
+
+    # Which two entries are fixed by a sweep and which two are free
+    _SWEEPS = {
+        "middle": ((1, 2), (0, 3)),
+        "outer": ((0, 2), (1, 3)),
+        "reversed outer": ((3, 1), (2, 0)),
+    }
+
+    def __init__(
+        self, text: Sequence[int], sweeps: Tuple[str, ...] = tuple(_SWEEPS)
+    ) -> None:
+        """The middle and outer sweeps are enough to count every pattern, the
+        reversed outer sweep saves a second sweep for some patterns."""
+        self._text = text
+        self._allowed = sweeps
+        self._sums: Dict[str, BandSums] = {}
+
+    def _band_sums(self, sweep: str) -> BandSums:
+        if sweep not in self._sums:
+            if sweep == "middle":
+                self._sums[sweep] = _middle_band_sums(self._text)
+            elif sweep == "outer":
+                self._sums[sweep] = _outer_band_sums(self._text)
+            else:
+                self._sums[sweep] = _outer_band_sums(self._text[::-1])
+        return self._sums[sweep]
+
+    def _cell(self, sweep: str, patt: Sequence[int]) -> Tuple[int, int, int]:
+        """The index of the band sum of the sweep that counts patt."""
+        (fst, snd), (free_1, free_2) = self._SWEEPS[sweep]
+        first, second = patt[fst], patt[snd]
+        return (
+            first < second,
+            _band(patt[free_1], first, second),
+            _band(patt[free_2], first, second),
+        )
+
+    def count(self, patt: Sequence[int]) -> int:
+        """Count the occurrences of patt."""
+        for sweep in self._allowed:
+            ascending, band_1, band_2 = self._cell(sweep, patt)
+            if band_1 != band_2:
+                # patt is the only pattern counted by this band sum
+                return self._band_sums(sweep)[ascending][band_1][band_2]
+        # The first and last entries are in the same band of the middle sweep,
+        # whose band sum also counts the pattern with their values swapped
+        ascending, band, _ = self._cell("middle", patt)
+        swapped = (patt[3], patt[1], patt[2], patt[0])
+        return self._band_sums("middle")[ascending][band][band] - self.count(swapped)
+
+
+def pattern_counts(text: Sequence[int], length: int) -> Dict[Tuple[int, ...], int]:
+    """Return the number of occurrences of every pattern of the given length,
+    which is at most 4, in text. All the counts are derived from the same
+    sweeps, so this is faster than counting the patterns one by one.
+
+    Examples:
+        >>> counts = pattern_counts((2, 1, 0, 3), 3)
+        >>> counts[(1, 0, 2)], counts[(1, 2, 0)]
+        (3, 0)
+        >>> sum(pattern_counts((4, 0, 3, 5, 1, 2), 4).values())
+        15
+    """
+    if length > 4:
+        raise ValueError("Can only count all patterns of length at most 4")
+    if length == 3:
+        return _three_pattern_counts(text)
+    if length == 4:
+        counter = _FourPatternCounter(text, ("middle", "outer"))
+        return {
+            patt: counter.count(patt) for patt in itertools.permutations(range(length))
+        }
+    return {
+        patt: cast(int, count_occurrences(patt, text))
+        for patt in itertools.permutations(range(length))
+    }
+
+
+def count_occurrences(patt: Sequence[int], text: Sequence[int]) -> Optional[int]:
+    """Return the number of occurrences of the classical pattern patt in text,
+    without finding the occurrences, or None if there is no counting method for
+    patt. Every pattern of length at most 4 and all monotone patterns can be
+    counted. Patterns of length at most 3 and monotone patterns take
+    O(n log n) time and patterns of length 4 take O(n^2) time.
+
+    Examples:
+        >>> count_occurrences((0, 2, 1), (0, 3, 1, 2))
+        2
+        >>> count_occurrences((1, 3, 0, 2), (2, 4, 0, 3, 1))
+        1
+        >>> count_occurrences((0, 4, 1, 3, 2), (0, 1, 2, 3, 4)) is None
+        True
+    """
+    patt = tuple(patt)
+    length = len(patt)
+    if length > len(text):
+        return 0
+    if patt == tuple(range(length)):
+        return _count_increasing(text, length)
+    if patt == tuple(range(length - 1, -1, -1)):
+        top = len(text) - 1
+        return _count_increasing([top - val for val in text], length)
+    if length == 3:
+        return _three_pattern_counts(text)[patt]
+    if length == 4:
+        return _FourPatternCounter(text).count(patt)
+    return None
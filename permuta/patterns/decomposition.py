@@ -0,0 +1,200 @@
+from typing import List, Optional, Sequence, Tuple
+
+
+class DecompositionNode:
+    """A node of the substitution decomposition tree of a perm. It covers the
+    entries at indices start up to but not including stop, whose values are
+    low up to but not including low + len(node). The kind is "leaf" for single
+    entries, "increasing" or "decreasing" for linear nodes, which are sums or
+    skew sums of their children, and "prime" for nodes whose children are
+    inflating a simple perm of length at least 4."""
+
+    __slots__ = ("start", "stop", "low", "kind", "children")
+
+    def __init__(
+        self,
+        start: int,
+        stop: int,
+        low: int,
+        kind: str,
+        children: Optional[List["DecompositionNode"]] = None,
+    ) -> None:
+        self.start = start
+        self.stop = stop
+        self.low = low
+        self.kind = kind
+        self.children: List["DecompositionNode"] = children or []
+
+    def skeleton(self) -> Tuple[int, ...]:
+        """Return the perm that is inflated by the children of the node, empty
+        for a leaf.
+
+        Examples:
+            >>> decomposition_tree((1, 3, 0, 2, 4)).skeleton()
+            (0, 1)
+            >>> decomposition_tree((1, 3, 0, 2, 4)).children[0].skeleton()
+            (1, 3, 0, 2)
+        """
+        order = sorted(range(len(self.children)), key=lambda i: self.children[i].low)
+        res = [0] * len(order)
+        for val, idx in enumerate(order):
+            res[idx] = val
+        return tuple(res)
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __repr__(self) -> str:
+        return (
+            f"DecompositionNode({self.start}, {self.stop}, {self.low}, "
+            f"{self.kind!r}, {self.children!r})"
+        )
+
+
+class _MinAddTree:
+    """A segment tree over the integers 0, ..., n - 1 supporting adding to a
+    range and finding the minimum of a prefix, both in O(log n) time. Additions
+    to a whole subtree are kept in its root."""
+
+    def __init__(self, values: Sequence[int]) -> None:
+        size = 1
+        while size < len(values):
+            size *= 2
+        self._size = size
+        inf = float("inf")
+        tree = [inf] * size + list(values) + [inf] * (size - len(values))
+        for pos in range(size - 1, 0, -1):
+            tree[pos] = min(tree[2 * pos], tree[2 * pos + 1])
+        # tree[pos] is the minimum of the subtree of pos, including the
+        # additions kept in pos and below it but not those kept above it
+        self._tree = tree
+        self._pending = [0] * size
+
+    def add(self, start: int, stop: int, delta: int) -> None:
+        """Add delta to the values at indices start up to but not including
+        stop."""
+        tree, pending, size = self._tree, self._pending, self._size
+        left, right = start + size, stop + size
+        while left < right:
+            if left & 1:
+                tree[left] += delta
+                if left < size:
+                    pending[left] += delta
+                left += 1
+            if right & 1:
+                right -= 1
+                tree[right] += delta
+                if right < size:
+                    pending[right] += delta
+            left >>= 1
+            right >>= 1
+        # Update the minima above the two ends of the range
+        left, right = (start + size) >> 1, (stop - 1 + size) >> 1
+        while left:
+            tree[left] = min(tree[2 * left], tree[2 * left + 1]) + pending[left]
+            if right != left:
+                tree[right] = min(tree[2 * right], tree[2 * right + 1]) + pending[right]
+            left >>= 1
+            right >>= 1
+
+    def prefix_min(self, stop: int) -> float:
+        """Return the minimum of the values at indices less than stop."""
+        tree, pending = self._tree, self._pending
+        res = float("inf")
+        pos, width, offset = 1, self._size, 0
+        while stop > 0:
+            if width <= stop:
+                return min(res, tree[pos] + offset)
+            offset += pending[pos]
+            width >>= 1
+            pos *= 2
+            if width <= stop:
+                res = min(res, tree[pos] + offset)
+                stop -= width
+                pos += 1
+        return res
+
+
+def decomposition_tree(perm: Sequence[int]) -> Optional[DecompositionNode]:
+    """Return the root of the substitution decomposition tree of perm, or None
+    if perm is empty. The entries are added from left to right, keeping a stack
+    of the trees of consecutive intervals covering the entries so far. The
+    intervals ending at the new entry are found with a segment tree holding
+    max - min + l for the entries from each l to the new one, which is at least
+    the index of the new entry, with equality exactly for intervals. This takes
+    O(n log n) time.
+
+    Examples:
+        >>> root = decomposition_tree((1, 3, 0, 2, 4))
+        >>> root.kind, [child.kind for child in root.children]
+        ('increasing', ['prime', 'leaf'])
+        >>> [(child.start, child.stop) for child in root.children[0].children]
+        [(0, 1), (1, 2), (2, 3), (3, 4)]
+    """
+    # pylint: disable=too-many-locals,too-many-branches
+    n = len(perm)
+    if n == 0:
+        return None
+    spans = _MinAddTree(range(n))
+    # The entries ending the runs of left ends sharing the same max and min
+    max_stack: List[int] = []
+    min_stack: List[int] = []
+    stack: List[DecompositionNode] = []
+    for idx, val in enumerate(perm):
+        while max_stack and perm[max_stack[-1]] < val:
+            top = max_stack.pop()
+            start = max_stack[-1] + 1 if max_stack else 0
+            spans.add(start, top + 1, val - perm[top])
+        max_stack.append(idx)
+        while min_stack and perm[min_stack[-1]] > val:
+            top = min_stack.pop()
+            start = min_stack[-1] + 1 if min_stack else 0
+            spans.add(start, top + 1, perm[top] - val)
+        min_stack.append(idx)
+        node = DecompositionNode(idx, idx + 1, val, "leaf")
+        while stack:
+            top_node = stack[-1]
+            if top_node.kind in ("increasing", "decreasing") and _adjacent(
+                top_node.children[-1], node
+            ):
+                top_node.children.append(node)
+                top_node.stop = node.stop
+                top_node.low = min(top_node.low, node.low)
+            elif _adjacent(top_node, node):
+                kind = "increasing" if top_node.low < node.low else "decreasing"
+                top_node = DecompositionNode(
+                    top_node.start,
+                    node.stop,
+                    min(top_node.low, node.low),
+                    kind,
+                    [top_node, node],
+                )
+            elif spans.prefix_min(node.start) == idx:
+                children = [node]
+                low, high = node.low, node.low + len(node)
+                while True:
+                    top_node = stack.pop()
+                    children.append(top_node)
+                    low = min(low, top_node.low)
+                    high = max(high, top_node.low + len(top_node))
+                    if high - low == idx + 1 - top_node.start:
+                        break
+                children.reverse()
+                node = DecompositionNode(children[0].start, idx + 1, low, "prime")
+                node.children = children
+                continue
+            else:
+                break
+            stack.pop()
+            node = top_node
+        stack.append(node)
+    assert len(stack) == 1
+    return stack[0]
+
+
+def _adjacent(first: DecompositionNode, second: DecompositionNode) -> bool:
+    """Check if the intervals of two nodes next to each other have adjacent
+    values."""
+    return first.low + len(first) == second.low or second.low + len(second) == (
+        first.low
+    )
@@ -0,0 +1,234 @@
+import bisect
+import itertools
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Kernel = Callable[[Sequence[int]], bool]
+Symmetry = Callable[[Sequence[int]], Sequence[int]]
+
+# Below this length the generic search is faster than setting up a kernel
+KERNEL_MIN_LENGTH = 16
+
+
+def _identity(perm: Sequence[int]) -> Sequence[int]:
+    return perm
+
+
+def _reverse(perm: Sequence[int]) -> Sequence[int]:
+    return perm[::-1]
+
+
+def _complement(perm: Sequence[int]) -> Sequence[int]:
+    top = len(perm) - 1
+    return [top - val for val in perm]
+
+
+def _inverse(perm: Sequence[int]) -> Sequence[int]:
+    inv = [0] * len(perm)
+    for idx, val in enumerate(perm):
+        inv[val] = idx
+    return inv
+
+
+_SYMMETRIES: Tuple[Symmetry, ...] = (
+    _identity,
+    _reverse,
+    _complement,
+    lambda perm: _complement(_reverse(perm)),
+    _inverse,
+    lambda perm: _reverse(_inverse(perm)),
+    lambda perm: _complement(_inverse(perm)),
+    lambda perm: _complement(_reverse(_inverse(perm))),
+)
+
+
+def _longest_increasing_at_least(text: Sequence[int], length: int) -> bool:
+    """Check if text has an increasing subsequence of the given length, using
+    patience sorting."""
+    if length == 0:
+        return True
+    tails: List[int] = []
+    for val in text:
+        pile = bisect.bisect_left(tails, val)
+        if pile == len(tails):
+            if pile + 1 == length:
+                return True
+            tails.append(val)
+        else:
+            tails[pile] = val
+    return False
+
+
+def _contains_021(text: Sequence[int]) -> bool:
+    """Check for an occurrence of 021 by scanning from the right with a stack of
+    candidates for the 2. The largest value popped off the stack is the best
+    candidate for the 1."""
+    stack: List[int] = []
+    third = -1
+    for val in reversed(text):
+        if val < third:
+            return True
+        while stack and stack[-1] < val:
+            third = stack.pop()
+        stack.append(val)
+    return False
+
+
+def _contains_0132(text: Sequence[int]) -> bool:
+    """The 32 of an occurrence ending in index d can always use the previous
+    greater element of d as the 3. The 01 then needs an element below text[d]
+    before it which is not a left-to-right minimum."""
+    n = len(text)
+    # non_ltrmin_min[p] is the smallest non left-to-right minimum before p
+    non_ltrmin_min = [n] * (n + 1)
+    smallest = n
+    stack: List[int] = []
+    for idx, val in enumerate(text):
+        while stack and text[stack[-1]] < val:
+            stack.pop()
+        if stack and non_ltrmin_min[stack[-1]] < val:
+            return True
+        stack.append(idx)
+        best = non_ltrmin_min[idx]
+        non_ltrmin_min[idx + 1] = val if smallest < val < best else best
+        smallest = min(smallest, val)
+    return False
+
+
+def _contains_1032(text: Sequence[int]) -> bool:
+    """The 32 of an occurrence ending in index d can always use the previous
+    greater element of d as the 3. The 10 then needs a descent pair before it
+    whose top is below text[d]. The next smaller element of the top is the
+    earliest bottom of such a pair."""
+    n = len(text)
+    # top_min[p] is the smallest top of a descent pair lying before p
+    top_min = [n] * (n + 1)
+    increasing: List[int] = []
+    decreasing: List[int] = []
+    for idx, val in enumerate(text):
+        while decreasing and text[decreasing[-1]] < val:
+            decreasing.pop()
+        if decreasing and top_min[decreasing[-1]] < val:
+            return True
+        decreasing.append(idx)
+        best = top_min[idx]
+        while increasing and text[increasing[-1]] > val:
+            best = min(best, text[increasing.pop()])
+        increasing.append(idx)
+        top_min[idx + 1] = best
+    return False
+
+
+def _contains_0321(text: Sequence[int]) -> bool:
+    """The 32 of an occurrence using index c as the 2 can always use the previous
+    greater element of c as the 3. With h(c) the smallest element before that,
+    an occurrence exists if some d > c has h(c) < text[d] < text[c]. These are
+    found by keeping min h(c) in a Fenwick tree indexed by reversed value."""
+    n = len(text)
+    prefix_min = [n] * (n + 1)
+    tree = [n] * (n + 1)
+    stack: List[int] = []
+    for idx, val in enumerate(text):
+        # Query min h(c) over earlier c with text[c] > val
+        pos, best = n - 1 - val, n
+        while pos > 0:
+            best = min(best, tree[pos])
+            pos -= pos & -pos
+        if best < val:
+            return True
+        prefix_min[idx + 1] = min(prefix_min[idx], val)
+        while stack and text[stack[-1]] < val:
+            stack.pop()
+        if stack:
+            pos, lowest = n - val, prefix_min[stack[-1]]
+            while pos <= n:
+                if lowest < tree[pos]:
+                    tree[pos] = lowest
+                pos += pos & -pos
+        stack.append(idx)
+    return False
+
+
+def _contains_0231(text: Sequence[int]) -> bool:
+    """The 023 of an occurrence using index b as the 2 can always use the next
+    greater element of b as the 3 and the smallest element before b as the 0.
+    Each b then gives an interval of values that an element after its next
+    greater element must land in. The intervals are kept in a Fenwick tree of
+    maximum upper end indexed by lower end."""
+    n = len(text)
+    prefix_min = [n] * (n + 1)
+    tree = [-1] * (n + 1)
+    stack: List[int] = []
+    for idx, val in enumerate(text):
+        # Query max upper end over intervals with lower end below val
+        pos, best = val, -1
+        while pos > 0:
+            best = max(best, tree[pos])
+            pos -= pos & -pos
+        if best > val:
+            return True
+        prefix_min[idx + 1] = min(prefix_min[idx], val)
+        while stack and text[stack[-1]] < val:
+            start = stack.pop()
+            lowest = prefix_min[start]
+            if lowest == n:
+                continue
+            pos, highest = lowest + 1, text[start]
+            while pos <= n:
+                if highest > tree[pos]:
+                    tree[pos] = highest
+                pos += pos & -pos
+        stack.append(idx)
+    return False
+
+
+def _build_kernels() -> Dict[Tuple[int, ...], Kernel]:
+    kernels: Dict[Tuple[int, ...], Kernel] = {}
+
+    def increasing(length: int) -> Kernel:
+        return lambda text: _longest_increasing_at_least(text, length)
+
+    representatives: List[Tuple[Tuple[int, ...], Kernel]] = [
+        (tuple(range(length)), increasing(length)) for length in range(5)
+    ]
+    representatives += [
+        ((0, 2, 1), _contains_021),
+        ((0, 1, 3, 2), _contains_0132),
+        ((1, 0, 3, 2), _contains_1032),
+        ((0, 3, 2, 1), _contains_0321),
+        ((0, 2, 3, 1), _contains_0231),
+    ]
+
+    def transformed(kernel: Kernel, symmetry: Symmetry) -> Kernel:
+        return lambda text: kernel(symmetry(text))
+
+    for representative, kernel in representatives:
+        for patt in itertools.permutations(range(len(representative))):
+            if patt in kernels:
+                continue
+            for symmetry in _SYMMETRIES:
+                if tuple(symmetry(patt)) == representative:
+                    if symmetry is _identity:
+                        kernels[patt] = kernel
+                    else:
+                        kernels[patt] = transformed(kernel, symmetry)
+                    break
+    return kernels
+
+
+_KERNELS = _build_kernels()
+
+
+def containment_kernel(patt: Sequence[int]) -> Optional[Kernel]:
+    """Return a function checking if a text contains the classical pattern patt,
+    or None if there is no dedicated kernel for it. The function takes a
+    permutation as any sequence of the integers 0, ..., n - 1.
+
+    Examples:
+        >>> kernel = containment_kernel((1, 3, 0, 2))
+        >>> kernel is None
+        True
+        >>> kernel = containment_kernel((2, 0, 1))
+        >>> kernel((0, 1, 3, 2)), kernel((3, 0, 2, 1))
+        (False, True)
+    """
+    return _KERNELS.get(tuple(patt))
@@ -0,0 +1,150 @@
+# A packed integer encoding of perms of length at most 16. The length is stored
+# in the lowest 5 bits and the entries above it, 4 bits each, with the first
+# entry lowest. The functions below work on the encoding without unpacking it.
+
+from typing import Sequence, Tuple
+
+MAX_PACKED_LENGTH = 16
+
+_LENGTH_BITS = 5
+_LENGTH_MASK = (1 << _LENGTH_BITS) - 1
+# A one in the lowest bit of every nibble and every byte, respectively
+_NIBBLE_ONES = int("1" * MAX_PACKED_LENGTH, 16)
+_BYTE_ONES = int("01" * (MAX_PACKED_LENGTH // 2), 16)
+_EVEN_NIBBLES = _BYTE_ONES * 0x0F
+_MASK_64 = (1 << 64) - 1
+
+
+def pack(perm: Sequence[int]) -> int:
+    """Return the packed encoding of perm.
+
+    Examples:
+        >>> pack((1, 0, 2))
+        16419
+        >>> unpack(pack((3, 0, 2, 1)))
+        (3, 0, 2, 1)
+    """
+    length = len(perm)
+    if length > MAX_PACKED_LENGTH:
+        raise ValueError(f"Can only pack perms of length at most {MAX_PACKED_LENGTH}")
+    entries = 0
+    for val in reversed(perm):
+        entries = (entries << 4) | val
+    return (entries << _LENGTH_BITS) | length
+
+
+def unpack(code: int) -> Tuple[int, ...]:
+    """Return the entries of the perm with the given encoding."""
+    entries = code >> _LENGTH_BITS
+    return tuple((entries >> (4 * idx)) & 0xF for idx in range(code & _LENGTH_MASK))
+
+
+def packed_length(code: int) -> int:
+    """Return the length of the perm with the given encoding."""
+    return code & _LENGTH_MASK
+
+
+def _greater_than(entries: int, val: int) -> int:
+    """Return a one in the lowest bit of every nibble of entries holding a value
+    larger than val. The even and odd nibbles are compared in separate byte
+    lanes, where adding 127 - val sets the top bit of exactly those lanes."""
+    offset = (127 - val) * _BYTE_ONES
+    even = (((entries & _EVEN_NIBBLES) + offset) >> 7) & _BYTE_ONES
+    odd = ((((entries >> 4) & _EVEN_NIBBLES) + offset) >> 7) & _BYTE_ONES
+    return even | (odd << 4)
+
+
+def packed_inverse(code: int) -> int:
+    """Return the encoding of the inverse.
+
+    Examples:
+        >>> unpack(packed_inverse(pack((2, 0, 3, 1))))
+        (1, 3, 0, 2)
+    """
+    length = code & _LENGTH_MASK
+    entries, res = code >> _LENGTH_BITS, 0
+    for idx in range(length):
+        res |= idx << (4 * ((entries >> (4 * idx)) & 0xF))
+    return (res << _LENGTH_BITS) | length
+
+
+def packed_reverse(code: int) -> int:
+    """Return the encoding of the reverse.
+
+    Examples:
+        >>> unpack(packed_reverse(pack((2, 0, 3, 1))))
+        (1, 3, 0, 2)
+    """
+    length = code & _LENGTH_MASK
+    entries, res = code >> _LENGTH_BITS, 0
+    for _ in range(length):
+        res = (res << 4) | (entries & 0xF)
+        entries >>= 4
+    return (res << _LENGTH_BITS) | length
+
+
+def packed_complement(code: int) -> int:
+    """Return the encoding of the complement. Every entry is subtracted from
+    length - 1 at once, which never borrows across nibbles.
+
+    Examples:
+        >>> unpack(packed_complement(pack((2, 0, 3, 1))))
+        (1, 3, 0, 2)
+    """
+    length = code & _LENGTH_MASK
+    if length == 0:
+        return code
+    ones = _NIBBLE_ONES >> (4 * (MAX_PACKED_LENGTH - length))
+    res = (length - 1) * ones - (code >> _LENGTH_BITS)
+    return (res << _LENGTH_BITS) | length
+
+
+def packed_remove(code: int, index: int) -> int:
+    """Return the encoding of the perm with the entry at index removed.
+
+    Examples:
+        >>> unpack(packed_remove(pack((2, 0, 3, 1)), 2))
+        (2, 0, 1)
+    """
+    length = code & _LENGTH_MASK
+    if not 0 <= index < length:
+        raise IndexError("index out of range")
+    entries = code >> _LENGTH_BITS
+    low = entries & ((1 << (4 * index)) - 1)
+    val = (entries >> (4 * index)) & 0xF
+    entries = low | ((entries >> (4 * (index + 1))) << (4 * index))
+    entries -= _greater_than(entries, val)
+    return (entries << _LENGTH_BITS) | (length - 1)
+
+
+def packed_insert(code: int, index: int, new_element: int) -> int:
+    """Return the encoding of the perm with new_element inserted at index, the
+    entries at least new_element being shifted up.
+
+    Examples:
+        >>> unpack(packed_insert(pack((2, 0, 1)), 2, 2))
+        (3, 0, 2, 1)
+    """
+    length = code & _LENGTH_MASK
+    if length >= MAX_PACKED_LENGTH:
+        raise ValueError(f"Can only pack perms of length at most {MAX_PACKED_LENGTH}")
+    if not 0 <= index <= length or not 0 <= new_element <= length:
+        raise IndexError("index or new_element out of range")
+    entries = code >> _LENGTH_BITS
+    if new_element > 0:
+        entries += _greater_than(entries, new_element - 1)
+    else:
+        entries += _NIBBLE_ONES >> (4 * (MAX_PACKED_LENGTH - length))
+    low = entries & ((1 << (4 * index)) - 1)
+    high = entries >> (4 * index)
+    entries = low | (new_element << (4 * index)) | (high << (4 * (index + 1)))
+    return (entries << _LENGTH_BITS) | (length + 1)
+
+
+def packed_hash(code: int) -> int:
+    """Return a well mixed 64 bit hash of the encoding, using the splitmix64
+    finaliser."""
+    value = (code ^ (code >> 64)) & _MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
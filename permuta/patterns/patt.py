@@ -1,6 +1,8 @@
 import abc
 from typing import TYPE_CHECKING, Iterator, Tuple
 
+from .pattern_matcher import PatternMatcher
+
 if TYPE_CHECKING:
     # pylint: disable=cyclic-import
     from .perm import Perm
@@ -9,6 +11,8 @@ if TYPE_CHECKING:
 class Patt(abc.ABC):
     """A permutation pattern, e.g. classical, bivincular and mesh patterns."""
 
+    __slots__ = ()
+
     def avoided_by(self, *patts: "Patt") -> bool:
         """Check if self is avoided by all the provided patterns."""
         return all(not patt.contains(self) for patt in patts)
@@ -17,6 +21,10 @@ class Patt(abc.ABC):
         """Check if self is a pattern of all the provided patterns."""
         return all(patt.contains(self) for patt in patts)
 
+    def compile(self) -> PatternMatcher:
+        """Return a matcher for finding occurrences of self in many perms."""
+        return PatternMatcher(self)
+
     def count_occurrences_in(self, patt: "Patt") -> int:
         """Count the number of occurrences of self in the pattern."""
         return sum(1 for _ in self.occurrences_in(patt))
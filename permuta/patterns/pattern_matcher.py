@@ -0,0 +1,241 @@
+import bisect
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .counting import count_occurrences
+from .kernels import KERNEL_MIN_LENGTH, containment_kernel
+from .planner import (
+    PLANNED_MIN_LENGTH,
+    Bound,
+    embedding_order,
+    plan_bounds,
+    planned_contains,
+)
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from .patt import Patt
+    from .perm import Perm
+
+
+class PatternMatcher:
+    """A classical or mesh pattern compiled for matching against many perms. The
+    bounds on the entries of an occurrence, and the shading, are kept in flat
+    lists and occurrences are found by backtracking without recursion, so
+    nothing is set up on each call. Use Patt.compile to create one.
+
+    Examples:
+        >>> from permuta import MeshPatt, Perm
+        >>> matcher = Perm((0, 2, 1)).compile()
+        >>> matcher.contains(Perm((3, 0, 4, 1, 2))), matcher.count(Perm((0, 2, 1)))
+        (True, 1)
+        >>> matcher = MeshPatt(Perm((1, 0)), [(2, 0)]).compile()
+        >>> matcher.first_occurrence(Perm((2, 1, 0)))
+        (0, 2)
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "patt",
+        "_length",
+        "_floors",
+        "_ceilings",
+        "_above_floor",
+        "_below_ceiling",
+        "_entry_of_rank",
+        "_shaded_columns",
+        "_classical",
+        "_kernel",
+        "_plan",
+    )
+
+    def __init__(self, patt: "Patt") -> None:
+        self.patt = patt
+        perm = patt.get_perm()
+        self._length = len(perm)
+        # pylint: disable=protected-access
+        details = perm._pattern_details()
+        self._floors = [detail[0] for detail in details]
+        self._ceilings = [detail[1] for detail in details]
+        self._above_floor = [detail[2] for detail in details]
+        self._below_ceiling = [detail[3] for detail in details]
+        self._entry_of_rank = list(perm.inverse())
+        # The shaded boxes of each column that has any, as pairs of the column
+        # and the set of its shaded rows
+        shading: FrozenSet[Tuple[int, int]] = getattr(patt, "shading", frozenset())
+        columns = sorted({x for x, _ in shading})
+        self._shaded_columns = [
+            (x, frozenset(y for col, y in shading if col == x)) for x in columns
+        ]
+        self._classical = not shading
+        self._kernel = containment_kernel(perm) if self._classical else None
+        # Containment of a classical pattern places its entries in a planned
+        # order rather than from left to right
+        self._plan: Optional[List[Bound]] = None
+        if self._classical and self._length >= PLANNED_MIN_LENGTH:
+            self._plan = plan_bounds(perm, embedding_order(perm))
+
+    def occurrences(
+        self,
+        perm: "Patt",
+        patt_colours: Optional[Sequence] = None,
+        perm_colours: Optional[Sequence] = None,
+    ) -> Iterator[Tuple[int, ...]]:
+        """Yield the indices of the occurrences of the pattern in a perm, in
+        the same order as Patt.occurrences_in. If colours are given, the colour
+        of each entry of the pattern has to match that of the entry of the perm
+        it is mapped to."""
+        return (
+            tuple(indices)
+            for indices in self._matches(perm, patt_colours, perm_colours)
+        )
+
+    def visit(
+        self,
+        perm: "Patt",
+        callback: Callable[[List[int]], Optional[bool]],
+        patt_colours: Optional[Sequence] = None,
+        perm_colours: Optional[Sequence] = None,
+    ) -> int:
+        """Call callback with the indices of each occurrence of the pattern in
+        perm, in order, and return the number of calls. The list passed is
+        reused for the next occurrence, so it must be copied to be kept. The
+        search stops early if callback returns True.
+
+        Examples:
+            >>> from permuta import Perm
+            >>> found = []
+            >>> def keep(indices):
+            ...     found.append(tuple(indices))
+            >>> Perm((1, 0)).compile().visit(Perm((0, 3, 2, 1)), keep)
+            3
+            >>> found
+            [(1, 2), (1, 3), (2, 3)]
+        """
+        calls = 0
+        for indices in self._matches(perm, patt_colours, perm_colours):
+            calls += 1
+            if callback(indices):
+                break
+        return calls
+
+    def _matches(
+        self,
+        perm: "Patt",
+        patt_colours: Optional[Sequence] = None,
+        perm_colours: Optional[Sequence] = None,
+    ) -> Iterator[List[int]]:
+        """Yield the indices of each occurrence in a single list that is updated
+        in place. The search keeps the candidate index for each entry of the
+        pattern in that list and backtracks without recursion."""
+        # pylint: disable=too-many-locals,too-many-branches
+        text = perm.get_perm()
+        if text is not perm and not self._classical:
+            # Occurrences in mesh patterns are not compiled
+            for occurrence in self.patt.occurrences_in(perm):
+                yield list(occurrence)
+            return
+        length, n = self._length, len(text)
+        if length > n:
+            return
+        indices = [0] * length
+        if length == 0:
+            if self._shading_respected(text, indices, []):
+                yield indices
+            return
+        floors, ceilings = self._floors, self._ceilings
+        above_floor, below_ceiling = self._above_floor, self._below_ceiling
+        shaded = bool(self._shaded_columns)
+        values = [0] * length
+        lower = [0] * length
+        upper = [0] * length
+        lower[0], upper[0] = above_floor[0], n - below_ceiling[0]
+        level, idx = 0, 0
+        while True:
+            last = n - length + level
+            low, high = lower[level], upper[level]
+            if patt_colours is None or perm_colours is None:
+                while idx <= last and not low <= text[idx] <= high:
+                    idx += 1
+            else:
+                colour = patt_colours[level]
+                while idx <= last and not (
+                    low <= text[idx] <= high and perm_colours[idx] == colour
+                ):
+                    idx += 1
+            if idx > last:
+                # Backtrack to the next candidate of the previous entry
+                level -= 1
+                if level < 0:
+                    return
+                idx = indices[level] + 1
+                continue
+            indices[level], values[level] = idx, text[idx]
+            idx += 1
+            if level + 1 == length:
+                if not shaded or self._shading_respected(text, indices, values):
+                    yield indices
+                continue
+            level += 1
+            floor, ceiling = floors[level], ceilings[level]
+            lower[level] = above_floor[level] + (0 if floor == -1 else values[floor])
+            upper[level] = (
+                n - below_ceiling[level]
+                if ceiling == -1
+                else values[ceiling] - below_ceiling[level]
+            )
+
+    def _shading_respected(
+        self, perm: "Perm", indices: List[int], values: List[int]
+    ) -> bool:
+        """Check that no entry of perm lands in a shaded box of the occurrence."""
+        ranked = [values[entry] for entry in self._entry_of_rank]
+        for col, rows in self._shaded_columns:
+            start = indices[col - 1] + 1 if col > 0 else 0
+            stop = indices[col] if col < self._length else len(perm)
+            for idx in range(start, stop):
+                if bisect.bisect(ranked, perm[idx]) in rows:
+                    return False
+        return True
+
+    def first_occurrence(self, perm: "Patt") -> Optional[Tuple[int, ...]]:
+        """Return the first occurrence of the pattern in perm, or None if there
+        is none."""
+        for indices in self._matches(perm):
+            return tuple(indices)
+        return None
+
+    def contains(self, perm: "Patt") -> bool:
+        """Check if the pattern occurs in perm. The search stops at the first
+        occurrence."""
+        if self._kernel is not None and len(perm) >= KERNEL_MIN_LENGTH:
+            return self._kernel(perm.get_perm())
+        if self._plan is not None:
+            return planned_contains(self._plan, perm.get_perm())
+        for _ in self._matches(perm):
+            return True
+        return False
+
+    def avoided_by(self, perm: "Patt") -> bool:
+        """Check if the pattern does not occur in perm."""
+        return not self.contains(perm)
+
+    def count(self, perm: "Patt") -> int:
+        """Count the occurrences of the pattern in perm."""
+        if self._classical:
+            res = count_occurrences(self.patt.get_perm(), perm.get_perm())
+            if res is not None:
+                return res
+        return sum(1 for _ in self._matches(perm))
+
+    def __repr__(self) -> str:
+        return f"PatternMatcher({self.patt!r})"
@@ -0,0 +1,181 @@
+import functools
+from typing import (
+    TYPE_CHECKING,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from .patt import Patt
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from .meshpatt import MeshPatt
+    from .perm import Perm
+
+Shading = FrozenSet[Tuple[int, int]]
+PatternDetail = Tuple[int, int, int, int]
+
+
+class _TrieNode:
+    """A node in a pattern trie. An edge to a child is labelled with the pattern
+    detail of the next entry of every pattern passing through the child."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = ("edges", "children", "shadings", "classical", "shortest")
+
+    def __init__(self) -> None:
+        self.edges: List[PatternDetail] = []
+        self.children: List["_TrieNode"] = []
+        # The shadings of the (mesh) patterns ending in this node
+        self.shadings: List[Shading] = []
+        # True if a classical pattern ends in this node
+        self.classical = False
+        # The fewest entries needed to complete a pattern from this node
+        self.shortest = -1
+
+    def child(self, detail: PatternDetail) -> "_TrieNode":
+        """Return the child along the edge with the given label, creating it if
+        needed."""
+        for edge, child in zip(self.edges, self.children):
+            if edge == detail:
+                return child
+        new_child = _TrieNode()
+        self.edges.append(detail)
+        self.children.append(new_child)
+        return new_child
+
+
+class PatternTrie:
+    """A collection of patterns compiled into a single matcher. The pattern
+    details of the patterns are merged into a prefix trie so that the search
+    for occurrences of patterns sharing a prefix is shared between them. Mesh
+    patterns are matched through their underlying perm and the shading is
+    checked when an occurrence of it is completed.
+
+    Examples:
+        >>> from permuta import Perm
+        >>> trie = PatternTrie((Perm((0, 2, 1)), Perm((0, 2, 1, 3))))
+        >>> trie.contained_in(Perm((3, 0, 4, 1, 2)))
+        True
+        >>> trie.avoided_by(Perm((3, 4, 0, 1, 2)))
+        True
+    """
+
+    def __init__(self, patts: Iterable[Patt] = ()) -> None:
+        self._root = _TrieNode()
+        self._patts: List[Patt] = []
+        self._depth = 0
+        for patt in patts:
+            self.add(patt)
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def compile(cls, patts: Tuple[Patt, ...]) -> "PatternTrie":
+        """Return a cached trie for a tuple of patterns."""
+        return cls(patts)
+
+    def add(self, patt: Patt) -> None:
+        """Add a classical or a mesh pattern to the trie."""
+        if not isinstance(patt, Patt):
+            raise TypeError("patt must be a Patt")
+        perm = patt.get_perm()
+        shading: Shading = getattr(patt, "shading", frozenset())
+        length = len(perm)
+        path = [self._root]
+        # pylint: disable=protected-access
+        for detail in perm._pattern_details():
+            path.append(path[-1].child(detail))
+        for depth, node in enumerate(path):
+            if node.shortest == -1 or length - depth < node.shortest:
+                node.shortest = length - depth
+        if shading:
+            path[-1].shadings.append(shading)
+        else:
+            path[-1].classical = True
+        self._patts.append(patt)
+        self._depth = max(self._depth, length)
+
+    def contained_in(self, patt: Patt) -> bool:
+        """Check if any pattern of the trie occurs in patt, which is either a
+        perm or a mesh pattern."""
+        root = self._root
+        if root.classical:
+            return True
+        perm = patt.get_perm()
+        n = len(perm)
+        if root.shortest == -1 or n < root.shortest:
+            return False
+        # Perms are their own underlying perm, mesh patterns are not
+        in_perm = perm is patt
+        values = [0] * self._depth
+        indices = [0] * self._depth
+
+        def shading_respected(node: _TrieNode, k: int) -> bool:
+            occurrence = tuple(indices[:k])
+            if in_perm:
+                return any(
+                    _shading_respected(perm, occurrence, shading)
+                    for shading in node.shadings
+                )
+            sub_shading = cast("MeshPatt", patt).sub_mesh_pattern(occurrence).shading
+            return any(shading <= sub_shading for shading in node.shadings)
+
+        def search(node: _TrieNode, start: int, k: int) -> bool:
+            # lfi = left floor index, lci = left ceiling index
+            # lbp = lower bound pre-computation, ubp = upper bound pre-computation
+            # See Perm.occurrences_in for how the bounds are derived
+            bounds = []
+            for (lfi, lci, lbp, ubp), child in zip(node.edges, node.children):
+                lower = lbp if lfi == -1 else values[lfi] + lbp
+                upper = n - ubp if lci == -1 else values[lci] - ubp
+                if lower <= upper:
+                    bounds.append((lower, upper, n - child.shortest - 1, child))
+            for idx in range(start, n - node.shortest + 1):
+                val = perm[idx]
+                for lower, upper, last, child in bounds:
+                    if lower <= val <= upper and idx <= last:
+                        values[k], indices[k] = val, idx
+                        if child.classical:
+                            return True
+                        if child.shadings and shading_respected(child, k + 1):
+                            return True
+                        if child.children and search(child, idx + 1, k + 1):
+                            return True
+            return False
+
+        return search(root, 0, 0)
+
+    def avoided_by(self, patt: Patt) -> bool:
+        """Check if every pattern of the trie is avoided by patt."""
+        return not self.contained_in(patt)
+
+    def __iter__(self) -> Iterator[Patt]:
+        return iter(self._patts)
+
+    def __len__(self) -> int:
+        return len(self._patts)
+
+    def __repr__(self) -> str:
+        return f"PatternTrie({tuple(self._patts)!r})"
+
+
+def _shading_respected(
+    perm: "Perm", occurrence: Sequence[int], shading: Shading
+) -> bool:
+    """Check that no point of perm lands in a shaded box of the occurrence."""
+    candidate = [perm[index] for index in occurrence]
+    x = 0
+    for element in perm:
+        if element in candidate:
+            x += 1
+            continue
+        y = sum(1 for candidate_element in candidate if candidate_element < element)
+        if (x, y) in shading:
+            return False
+    return True
@@ -2,7 +2,6 @@
 # pylint: disable=too-many-lines
 # pylint: disable=too-many-public-methods
 
-import bisect
 import collections
 import functools
 import itertools
@@ -12,6 +11,8 @@ import operator
 import random
 from typing import (
     Callable,
+    ClassVar,
+    Counter,
     Deque,
     Dict,
     Iterable,
@@ -24,10 +25,16 @@ from typing import (
     Union,
 )
 
-from permuta.misc import HTMLViewer
+from permuta.misc import FenwickTree, HTMLViewer
 from permuta.misc.math import is_prime
 
+from . import packed
+from .counting import count_occurrences, pattern_counts
+from .decomposition import DecompositionNode, decomposition_tree
+from .kernels import KERNEL_MIN_LENGTH, containment_kernel
 from .patt import Patt
+from .pattern_matcher import PatternMatcher
+from .pattern_trie import PatternTrie
 
 __all__ = ("Perm",)
 
@@ -37,6 +44,19 @@ ApplyType = TypeVar("ApplyType")  # pylint: disable=invalid-name
 class Perm(Tuple[int], Patt):
     """A perm class."""
 
+    # Perms have no instance dict. Data derived from a perm is cached in bounded
+    # caches keyed by the perm instead. The hash is not cached: a tuple subclass
+    # can not have slots to keep it in, and looking it up from Python code is
+    # several times slower than tuple.__hash__ for the short perms in levels.
+    __slots__ = ()
+
+    # Perms longer than this are ranked by Perm.rank in Perm.rank_many, as their
+    # ranks are too large to accumulate one digit at a time
+    _RANK_MANY_MAX_HORNER_LENGTH = 64
+
+    # The pool of interned perms, see Perm.intern
+    _INTERNED: ClassVar[Dict["Perm", "Perm"]] = {}
+
     def __new__(cls, iterable: Iterable[int] = ()) -> "Perm":
         """Return a Perm instance.
 
@@ -48,9 +68,24 @@ class Perm(Tuple[int], Patt):
         """
         return tuple.__new__(cls, iterable)
 
-    def __init__(self, _iterable: Iterable[int] = ()) -> None:
-        # Cache for data used when finding occurrences of self in a perm
-        self._cached_pattern_details: Optional[List[Tuple[int, int, int, int]]] = None
+    def intern(self) -> "Perm":
+        """Return the interned perm equal to this one, adding this one to the pool
+        if there is none. Equal perms that are interned are the same object, so
+        that large collections of perms can share memory and equality checks
+        between them are identity checks. The pool holds on to the perms until
+        Perm.clear_interned is called.
+
+        Examples:
+            >>> perm = Perm((1, 0, 2)).intern()
+            >>> Perm([1, 0, 2]).intern() is perm
+            True
+        """
+        return Perm._INTERNED.setdefault(self, self)
+
+    @staticmethod
+    def clear_interned() -> None:
+        """Empty the pool of interned perms."""
+        Perm._INTERNED.clear()
 
     @classmethod
     def to_standard(cls, iterable: Iterable) -> "Perm":
@@ -98,6 +133,27 @@ class Perm(Tuple[int], Patt):
             integer //= 10
         return cls.to_standard(reversed(digit_list))
 
+    @classmethod
+    def unpack(cls, code: int) -> "Perm":
+        """Return the perm with the given packed encoding, see Perm.pack.
+
+        Examples:
+            >>> Perm.unpack(Perm((2, 0, 1)).pack())
+            Perm((2, 0, 1))
+        """
+        return cls(packed.unpack(code))
+
+    def pack(self) -> int:
+        """Return the perm packed into a single int, using 4 bits per entry.
+        Only perms of length at most 16 can be packed. The functions in
+        permuta.patterns.packed work directly on packed perms.
+
+        Examples:
+            >>> Perm((1, 0, 2)).pack()
+            16419
+        """
+        return packed.pack(self)
+
     @classmethod
     def from_string(cls, string: str) -> "Perm":
         """Return the perm corresponding to the string given.
@@ -181,14 +237,120 @@ class Perm(Tuple[int], Patt):
         return cls(result)
 
     @classmethod
-    def of_length(cls, length: int) -> Iterator["Perm"]:
+    def of_length(
+        cls,
+        length: int,
+        start_rank: int = 0,
+        stop_rank: Optional[int] = None,
+        shard: int = 0,
+        num_shards: int = 1,
+    ) -> Iterator["Perm"]:
         """Generate all permutations of a given length in lexicographical order.
 
+        Only the perms whose rank among the perms of the given length is from
+        start_rank up to but not including stop_rank are generated. If
+        num_shards is given the perms are split into that many contiguous
+        pieces of nearly equal size and only those in piece number shard are
+        generated. A scan of a shard can be resumed by passing the rank after
+        the last perm seen as start_rank. The perms before the first one
+        generated are skipped without being generated.
+
         Examples:
             >>> list(Perm.of_length(2))
             [Perm((0, 1)), Perm((1, 0))]
+            >>> list(Perm.of_length(3, start_rank=2, stop_rank=4))
+            [Perm((1, 0, 2)), Perm((1, 2, 0))]
+            >>> list(Perm.of_length(3, shard=2, num_shards=3))
+            [Perm((2, 0, 1)), Perm((2, 1, 0))]
+            >>> list(Perm.of_length(3, start_rank=5, shard=2, num_shards=3))
+            [Perm((2, 1, 0))]
+        """
+        if not 0 <= shard < num_shards:
+            raise ValueError("shard must be at least 0 and less than num_shards")
+        if start_rank < 0:
+            raise ValueError("start_rank must be non-negative")
+        total = math.factorial(length)
+        stop_rank = total if stop_rank is None else min(stop_rank, total)
+        start_rank = max(start_rank, shard * total // num_shards)
+        stop_rank = min(stop_rank, (shard + 1) * total // num_shards)
+        if start_rank == 0 and stop_rank == total:
+            yield from (cls(perm) for perm in itertools.permutations(range(length)))
+        elif start_rank < stop_rank:
+            yield from (
+                cls(perm)
+                for perm in Perm._lexicographic_slice(
+                    (), list(range(length)), start_rank, stop_rank
+                )
+            )
+
+    @staticmethod
+    def _lexicographic_slice(
+        prefix: Tuple[int, ...], remaining: List[int], start: int, stop: int
+    ) -> Iterator[Tuple[int, ...]]:
+        """Generate prefix followed by the arrangements of the sorted remaining
+        values with rank from start up to but not including stop. The subtrees
+        entirely within the range are generated by itertools.permutations."""
+        count = len(remaining)
+        if start == 0 and stop == math.factorial(count):
+            yield from (prefix + perm for perm in itertools.permutations(remaining))
+            return
+        block = math.factorial(count - 1)
+        for idx in range(start // block, (stop - 1) // block + 1):
+            offset = idx * block
+            yield from Perm._lexicographic_slice(
+                prefix + (remaining[idx],),
+                remaining[:idx] + remaining[idx + 1 :],
+                max(start - offset, 0),
+                min(stop - offset, block),
+            )
+
+    @classmethod
+    def of_length_gray(cls, length: int) -> Iterator["Perm"]:
+        """Generate all perms of a given length in the order of the
+        Steinhaus-Johnson-Trotter algorithm, where each perm differs from the
+        previous one by swapping two adjacent entries.
+
+        Examples:
+            >>> [str(perm) for perm in Perm.of_length_gray(3)]
+            ['012', '021', '201', '210', '120', '102']
         """
-        yield from (cls(perm) for perm in itertools.permutations(range(length)))
+        perm = list(range(length))
+        yield cls(perm)
+        for idx in cls.gray_swaps(length):
+            perm[idx], perm[idx + 1] = perm[idx + 1], perm[idx]
+            yield cls(perm)
+
+    @staticmethod
+    def gray_swaps(length: int) -> Iterator[int]:
+        """Yield the index of the left entry of each adjacent swap taking the
+        identity through all perms of the given length in the order of
+        Perm.of_length_gray. This is Knuth's plain changes algorithm, which
+        takes amortised constant time per swap.
+
+        Examples:
+            >>> list(Perm.gray_swaps(3))
+            [1, 0, 1, 0, 1]
+        """
+        if length < 2:
+            return
+        # offset[j] is the number of entries less than j to the right of j, which
+        # changes by direction[j] each time j moves
+        offset = [0] * length
+        direction = [1] * length
+        while True:
+            j, shift = length - 1, 0
+            while True:
+                moved = offset[j] + direction[j]
+                if 0 <= moved <= j:
+                    break
+                if moved > j:
+                    if j == 1:
+                        return
+                    shift += 1
+                direction[j] = -direction[j]
+                j -= 1
+            yield j - max(offset[j], moved) + shift
+            offset[j] = moved
 
     @classmethod
     def up_to_length(cls, length: int) -> Iterator["Perm"]:
@@ -266,26 +428,104 @@ class Perm(Tuple[int], Patt):
             >>> Perm.unrank(1, 3)
             Perm((0, 2, 1))
         """
-        if number == 0:
-            return cls.identity(0 if length is None else length)
-        factorial = [1, 1]
         if length is None:
-            while number > factorial[-1]:
-                number -= factorial[-1]
-                factorial.append(factorial[-1] * len(factorial))
-            return cls(cls._unrank(number - 1, len(factorial) - 1, factorial))
-        for i in range(len(factorial), length):
-            factorial.append(i * factorial[-1])
-        return cls(cls._unrank(number, length, factorial))
+            length = Perm._length_of_rank(number)
+            number -= Perm._count_shorter(length)
+        return cls(cls._unrank(number, length))
 
     @staticmethod
-    def _unrank(number: int, length: int, factorial: List[int]) -> Iterator[int]:
+    def _unrank(number: int, length: int) -> List[int]:
         assert length >= 0
-        assert 0 <= number < factorial[length - 1] * length
-        candidates = list(range(length))
-        for val in range(1, length + 1):
-            division, number = divmod(number, factorial[length - val])
-            yield candidates.pop(division)
+        assert 0 <= number < math.factorial(length)
+        # The factorial number system digits of number, least significant first
+        digits = []
+        for base in range(1, length + 1):
+            number, digit = divmod(number, base)
+            digits.append(digit)
+        # The digit is the position of the next value among the remaining ones
+        remaining = FenwickTree.from_list([1] * length)
+        res = []
+        for digit in reversed(digits):
+            val = remaining.find(digit)
+            remaining.add(val, -1)
+            res.append(val)
+        return res
+
+    @staticmethod
+    def _length_of_rank(number: int) -> int:
+        """Return the length of the perm with the given rank."""
+        # Estimate the length from the size of the number and then correct it
+        log_number = number.bit_length() * math.log(2)
+        length = 0
+        while math.lgamma(length + 2) < log_number:
+            length += 1
+        length = max(0, length - 3)
+        while Perm._count_shorter(length + 1) <= number:
+            length += 1
+        return length
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _count_shorter(length: int) -> int:
+        """Return the number of perms of length less than length, that is the sum
+        of k! for k < length."""
+
+        def partial_sums(start: int, stop: int) -> Tuple[int, int]:
+            # The sum of start * ... * k for k in range(start, stop), along with
+            # the product of range(start, stop), splitting the range in halves
+            if stop - start == 1:
+                return start, start
+            mid = (start + stop) // 2
+            left, left_product = partial_sums(start, mid)
+            right, right_product = partial_sums(mid, stop)
+            return left + left_product * right, left_product * right_product
+
+        if length <= 1:
+            return length
+        return 1 + partial_sums(1, length)[0]
+
+    @classmethod
+    def unrank_range(
+        cls, start: int, stop: int, length: Optional[int] = None
+    ) -> Iterator["Perm"]:
+        """Generate the perms with rank from start up to but not including stop,
+        in lexicographical order. The first perm is unranked and the rest are
+        found by stepping to the next perm. If length is given the ranks are
+        among the perms of that length.
+
+        Examples:
+            >>> list(Perm.unrank_range(3, 6))
+            [Perm((1, 0)), Perm((0, 1, 2)), Perm((0, 2, 1))]
+            >>> list(Perm.unrank_range(4, 6, 3))
+            [Perm((2, 0, 1)), Perm((2, 1, 0))]
+        """
+        if start >= stop:
+            return
+        current = cls.unrank(start, length)
+        if length is not None:
+            assert stop <= math.factorial(length)
+        lst = list(current)
+        yield current
+        for _ in range(stop - start - 1):
+            if not Perm._next_lexicographic(lst):
+                lst = list(range(len(lst) + 1))
+            yield cls(lst)
+
+    @staticmethod
+    def _next_lexicographic(lst: List[int]) -> bool:
+        """Rearrange lst into the next perm of the same length in lexicographical
+        order. Return False, leaving lst untouched, if it is the last one."""
+        idx = len(lst) - 2
+        while idx >= 0 and lst[idx] > lst[idx + 1]:
+            idx -= 1
+        if idx < 0:
+            return False
+        swap = len(lst) - 1
+        while lst[swap] < lst[idx]:
+            swap -= 1
+        lst[idx], lst[swap] = lst[swap], lst[idx]
+        lst[idx + 1 :] = reversed(lst[idx + 1 :])
+        return True
 
     ind2perm = unrank
 
@@ -712,10 +952,7 @@ class Perm(Tuple[int], Patt):
         >>> p.complement().skew_decomposable()
         True
         """
-        n = len(self)
-        return any(
-            set(range(n - i, n)) == set(itertools.islice(self, i)) for i in range(1, n)
-        )
+        return len(self.skew_decomposition()) > 1
 
     skew_decomposable = is_skew_decomposable
 
@@ -729,9 +966,7 @@ class Perm(Tuple[int], Patt):
         >>> p.reverse().sum_decomposable()
         False
         """
-        return any(
-            set(range(i)) == set(itertools.islice(self, i)) for i in range(1, len(self))
-        )
+        return len(self.sum_decomposition()) > 1
 
     sum_decomposable = is_sum_decomposable
 
@@ -1092,10 +1327,7 @@ class Perm(Tuple[int], Patt):
             >>> Perm((0, 1, 2)).order()
             1
         """
-        acc = 1
-        for cycle in map(len, self.cycle_decomp()):
-            acc = (acc * cycle) // math.gcd(acc, cycle)
-        return acc
+        return math.lcm(*set(self.cycle_type()))
 
     def ltrmin(self) -> Iterator[int]:
         """Returns the positions of the left-to-right minima.
@@ -1267,6 +1499,16 @@ class Perm(Tuple[int], Patt):
         See: https://www.findstat.org/StatisticsDatabase/St001469/
         https://mathoverflow.net/questions/340179/how-rare-are-unholey-permutations
 
+        This is the maximum over sets S of positions of the number of pairs of
+        adjacent positions in S minus the number of pairs of adjacent values in
+        the image of S. The sets are built one position at a time, remembering
+        only the chosen positions that have an adjacent value further right.
+        This takes O(n 2^w) time and O(2^w) memory instead of O(n 2^n) time,
+        where w is the largest number of pairs of adjacent values split by a cut
+        between two positions. It is not polynomial: w grows with n for random
+        perms, which take seconds at length 50 and may run out of memory
+        beyond that. No polynomial algorithm is known.
+
         Examples:
             >>> Perm((1, 0)).holeyness()
             0
@@ -1276,20 +1518,40 @@ class Perm(Tuple[int], Patt):
             1
             >>> Perm((1, 0, 2)).holeyness()
             1
+            >>> Perm((0, 2, 1, 5, 4, 6, 3)).holeyness()
+            2
         """
-
-        def _delta(d_set: Set[int]) -> int:
-            return sum(1 for x in d_set if x + 1 not in d_set)
-
-        def _set_generator(num: int) -> Iterator[Set[int]]:
-            for y in range(0, num + 1):
-                for x in itertools.combinations(range(num), y):
-                    yield set(x)
-
-        return max(
-            _delta({self[s] for s in tmp_set}) - _delta(tmp_set)
-            for tmp_set in _set_generator(len(self))
-        )
+        # pylint: disable=too-many-locals
+        n = len(self)
+        inverse = self.inverse()
+        # The earlier positions holding a value adjacent to the one at each index
+        earlier: List[List[int]] = [[] for _ in range(n)]
+        # The last index at which each position is still needed
+        last_needed = list(range(1, n + 1))
+        for val in range(n - 1):
+            first, second = sorted((inverse[val], inverse[val + 1]))
+            earlier[second].append(first)
+            last_needed[first] = max(last_needed[first], second)
+        expired = [0] * (n + 1)
+        for idx, last in enumerate(last_needed):
+            expired[last] |= 1 << idx
+        # Map the chosen positions still needed to the best value so far
+        states = {0: 0}
+        for idx in range(n):
+            new_states: Dict[int, int] = {}
+            keep, bit = ~expired[idx], 1 << idx
+            for chosen, value in states.items():
+                key = chosen & keep
+                if new_states.get(key, value - 1) < value:
+                    new_states[key] = value
+                if idx > 0 and chosen & (bit >> 1):
+                    value += 1
+                value -= sum((chosen >> pos) & 1 for pos in earlier[idx])
+                key = (chosen | bit) & keep
+                if new_states.get(key, value - 1) < value:
+                    new_states[key] = value
+            states = new_states
+        return max(states.values())
 
     def count_stack_sorts(self):
         """The number of stack-sorts needed to sort a permutation.
@@ -2073,19 +2335,93 @@ class Perm(Tuple[int], Patt):
             >>> Perm((4, 2, 7, 0, 3, 1, 6, 5)).cycle_decomp()
             deque([[4, 3, 0], [6], [7, 5, 1, 2]])
         """
-        n = len(self)
-        remaining_elements = set(range(n))
-        cyclelist: Deque[List[int]] = collections.deque()
-        while remaining_elements:
-            max_not_seen = max(remaining_elements)
-            cycle, val = [max_not_seen], self[max_not_seen]
-            remaining_elements.remove(val)
-            while val != max_not_seen:
+        return collections.deque(list(cycle) for cycle in self._cycles())
+
+    def _cycles(self) -> Tuple[Tuple[int, ...], ...]:
+        """Return the cycles, each starting with its largest element, ordered by
+        their largest elements."""
+        return Perm._find_cycles(self)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _find_cycles(perm: "Perm") -> Tuple[Tuple[int, ...], ...]:
+        """A cached function finding the cycles of a perm in O(n) time, by
+        starting a cycle at each element not yet seen, from the largest down."""
+        seen = bytearray(len(perm))
+        cycles: List[Tuple[int, ...]] = []
+        for start in range(len(perm) - 1, -1, -1):
+            if seen[start]:
+                continue
+            cycle = [start]
+            seen[start] = 1
+            val = perm[start]
+            while val != start:
                 cycle.append(val)
-                val = self(val)
-                remaining_elements.remove(val)
-            cyclelist.appendleft(cycle)
-        return cyclelist
+                seen[val] = 1
+                val = perm[val]
+            cycles.append(tuple(cycle))
+        cycles.reverse()
+        return tuple(cycles)
+
+    def cycle_type(self) -> Tuple[int, ...]:
+        """Return the lengths of the cycles in decreasing order.
+
+        Examples:
+            >>> Perm((4, 2, 7, 0, 3, 1, 6, 5)).cycle_type()
+            (4, 3, 1)
+            >>> Perm().cycle_type()
+            ()
+        """
+        return tuple(sorted(map(len, self._cycles()), reverse=True))
+
+    def conjugacy_class_key(self) -> Tuple[int, ...]:
+        """Return a key that is equal for two perms if and only if they are
+        conjugate in the symmetric group, that is, if they have the same cycle
+        type.
+
+        Examples:
+            >>> perm = Perm((1, 2, 0, 4, 3))
+            >>> other = Perm((4, 3, 0, 1, 2))
+            >>> perm.conjugacy_class_key() == other.conjugacy_class_key()
+            True
+            >>> perm.conjugacy_class_key() == perm.inverse().conjugacy_class_key()
+            True
+        """
+        return self.cycle_type()
+
+    @classmethod
+    def cycle_index(cls, perms: Iterable["Perm"]) -> Counter[Tuple[int, ...]]:
+        """Count the perms of each cycle type. A cycle type (l_1, ..., l_k)
+        stands for the monomial x_(l_1) * ... * x_(l_k), so dividing the counts
+        by the number of perms gives the cycle index of a group of perms.
+
+        Examples:
+            >>> sorted(Perm.cycle_index(Perm.of_length(3)).items())
+            [((1, 1, 1), 1), ((2, 1), 3), ((3,), 2)]
+        """
+        return collections.Counter(perm.cycle_type() for perm in perms)
+
+    def power(self, k: int) -> "Perm":
+        """Return the perm composed with itself k times, where k can be any
+        integer. It takes O(n) time by moving k mod l steps along each cycle of
+        length l.
+
+        Examples:
+            >>> Perm((1, 2, 3, 0, 5, 4)).power(2)
+            Perm((2, 3, 0, 1, 4, 5))
+            >>> Perm((1, 2, 0)).power(-1)
+            Perm((2, 0, 1))
+            >>> Perm((1, 2, 0)).power(10**100)
+            Perm((1, 2, 0))
+        """
+        res = [0] * len(self)
+        for cycle in self._cycles():
+            length = len(cycle)
+            shift = k % length
+            for idx, val in enumerate(cycle):
+                # self maps cycle[idx] to cycle[idx + 1]
+                res[val] = cycle[(idx + shift) % length]
+        return Perm(res)
 
     def count_cycles(self) -> int:
         """Returns the number of cycles in the permutation.
@@ -2093,7 +2429,7 @@ class Perm(Tuple[int], Patt):
         >>> Perm((5, 3, 8, 1, 0, 4, 2, 7, 6)).count_cycles()
         4
         """
-        return len(self.cycle_decomp())
+        return len(self._cycles())
 
     num_cycles = count_cycles
 
@@ -2119,19 +2455,71 @@ class Perm(Tuple[int], Patt):
             >>> Perm((0, 2, 1, 3)).rank()
             12
         """
-        n, res = len(self), 0
-        fact = [1]
-        for i in range(n):
-            fact.append(fact[i] * (i + 1))
-        vals: List[int] = []
-        for idx, val in enumerate(self):
-            ordered_pos = bisect.bisect_left(vals, val)
-            res += (val - ordered_pos) * fact[n - idx - 1] + fact[n - idx - 1]
-            vals.insert(ordered_pos, val)
-        return res
+        n = len(self)
+        res, _ = Perm._from_factorial_digits(self.rank_encoding(), 0, n)
+        return res + Perm._count_shorter(n)
+
+    @staticmethod
+    def _from_factorial_digits(
+        digits: List[int], start: int, stop: int
+    ) -> Tuple[int, int]:
+        """Return the number with factorial number system digits[start:stop],
+        where the digit at index idx has weight (len(digits) - idx - 1)!, divided
+        by (len(digits) - stop)!, along with the product of the bases of the
+        digits. The halves are combined so that the big numbers multiplied have
+        similar sizes."""
+        if stop - start <= 1:
+            if start == stop:
+                return 0, 1
+            return digits[start], len(digits) - start
+        mid = (start + stop) // 2
+        left, left_bases = Perm._from_factorial_digits(digits, start, mid)
+        right, right_bases = Perm._from_factorial_digits(digits, mid, stop)
+        return left * right_bases + right, left_bases * right_bases
 
     perm2ind = rank
 
+    @staticmethod
+    def rank_many(perms: Iterable["Perm"]) -> List[int]:
+        """Computes the ranks of many permutations. A single Fenwick tree buffer
+        is cleared and reused for every perm, and the ranks of short perms are
+        accumulated digit by digit without building their rank encodings.
+
+        Examples:
+            >>> Perm.rank_many([Perm((0, 1)), Perm((0, 2, 1, 3)), Perm()])
+            [2, 12, 0]
+        """
+        tree: List[int] = []
+        zeros: List[int] = []
+        shorter: Dict[int, int] = {}
+        res = []
+        for perm in perms:
+            n = len(perm)
+            if n > Perm._RANK_MANY_MAX_HORNER_LENGTH:
+                res.append(perm.rank())
+                continue
+            size = n + 1
+            if len(tree) < size:
+                tree.extend([0] * (size - len(tree)))
+                zeros = [0] * len(tree)
+            rank = 0
+            for idx, val in enumerate(perm):
+                # The number of smaller values seen, from the Fenwick tree
+                pos, seen = val, 0
+                while pos > 0:
+                    seen += tree[pos]
+                    pos -= pos & -pos
+                rank = rank * (n - idx) + val - seen
+                pos = val + 1
+                while pos < size:
+                    tree[pos] += 1
+                    pos += pos & -pos
+            tree[:size] = zeros[:size]
+            if n not in shorter:
+                shorter[n] = Perm._count_shorter(n)
+            res.append(rank + shorter[n])
+        return res
+
     def threepats(self) -> Dict["Perm", int]:
         """Returns a dictionary of the number of occurrences of each
         permutation pattern of length 3.
@@ -2144,8 +2532,11 @@ class Perm(Tuple[int], Patt):
             0
         """
         return collections.Counter(
-            Perm.to_standard((left, mid, right))
-            for left, mid, right in itertools.combinations(self, 3)
+            {
+                Perm(patt): count
+                for patt, count in pattern_counts(self, 3).items()
+                if count
+            }
         )
 
     def fourpats(self) -> Dict["Perm", int]:
@@ -2160,8 +2551,11 @@ class Perm(Tuple[int], Patt):
             0
         """
         return collections.Counter(
-            Perm.to_standard((left, mid_left, mid_right, right))
-            for left, mid_left, mid_right, right in itertools.combinations(self, 4)
+            {
+                Perm(patt): count
+                for patt, count in pattern_counts(self, 4).items()
+                if count
+            }
         )
 
     def rank_encoding(self) -> List[int]:
@@ -2174,9 +2568,12 @@ class Perm(Tuple[int], Patt):
             >>> Perm((0, 2, 4, 3, 1)).rank_encoding()
             [0, 1, 2, 1, 0]
         """
-        rank_encoding = [0] * len(self)
-        for left, _ in self.inversions():
-            rank_encoding[left] += 1
+        # The smaller elements to the right are those not to the left
+        seen = FenwickTree(len(self))
+        rank_encoding = []
+        for val in self:
+            rank_encoding.append(val - seen.prefix_sum(val))
+            seen.add(val)
         return rank_encoding
 
     def sum_decomposition(self) -> List["Perm"]:
@@ -2380,6 +2777,19 @@ class Perm(Tuple[int], Patt):
             )
         )
 
+    def decomposition_tree(self) -> Optional[DecompositionNode]:
+        """Return the root of the substitution decomposition tree, or None for
+        the empty perm. It is computed in O(n log n) time.
+
+        Examples:
+            >>> root = Perm((2, 0, 3, 1, 4)).decomposition_tree()
+            >>> root.kind, root.skeleton()
+            ('increasing', (0, 1))
+            >>> root.children[0].kind, root.children[0].skeleton()
+            ('prime', (2, 0, 3, 1))
+        """
+        return decomposition_tree(self)
+
     def maximum_block(self) -> Tuple[int, int]:
         """Finds the biggest interval, and returns (i,j) if one is found,
         where i is the size of the interval, and j is the index of the first
@@ -2390,11 +2800,18 @@ class Perm(Tuple[int], Patt):
             >>> Perm((0, 2, 1, 5, 6, 7, 4, 3)).maximum_block()
             (7, 1)
         """
-        blocks = self.block_decomposition()
-        for length, indexlist in reversed(list(enumerate(blocks))):
-            if len(indexlist) != 0:
-                return (length, indexlist[0])
-        return (0, 0)
+        root = self.decomposition_tree()
+        if root is None or root.kind == "leaf":
+            return (0, 0)
+        if root.kind == "prime":
+            # Every proper interval lies within a child
+            largest = max(root.children, key=len)
+            return (len(largest), largest.start) if len(largest) > 1 else (0, 0)
+        # The largest proper intervals leave out the first or the last child
+        length = len(self) - min(len(root.children[0]), len(root.children[-1]))
+        if length < 2:
+            return (0, 0)
+        return (length, 0 if length == root.children[-1].start else len(self) - length)
 
     maximal_interval = maximum_block
     simple_location = maximum_block
@@ -2408,7 +2825,17 @@ class Perm(Tuple[int], Patt):
             >>> Perm((2, 0, 1)).is_simple()
             False
         """
-        return self.simple_location()[0] == 0
+        if len(self) < 4:
+            return len(self) < 3
+        # Two entries adjacent in both position and value form an interval
+        if any(
+            abs(fst - snd) == 1
+            for fst, snd in zip(self, itertools.islice(self, 1, None))
+        ):
+            return False
+        root = self.decomposition_tree()
+        assert root is not None
+        return root.kind == "prime" and len(root.children) == len(self)
 
     def is_strongly_simple(self) -> bool:
         """Checks if the permutation is strongly simple, that is if the
@@ -2421,6 +2848,69 @@ class Perm(Tuple[int], Patt):
         """
         return self.is_simple() and all(patt.is_simple() for patt in self.children())
 
+    @classmethod
+    def simples_of_length(
+        cls, length: int, keep: Optional[Callable[["Perm"], bool]] = None
+    ) -> Iterator["Perm"]:
+        """Generate the simple permutations of a given length in lexicographical
+        order. If keep is given, only the perms for which it is true are
+        generated. It must also be true for every pattern of such a perm, as for
+        membership of a permutation class, since the simples it rejects are not
+        extended.
+
+        Every simple perm, except the parallel alternations, is a one-point
+        extension of a simple perm one shorter (Schmerl and Trotter), so the
+        simples are built up from those of length 4.
+
+        Examples:
+            >>> list(Perm.simples_of_length(4))
+            [Perm((1, 3, 0, 2)), Perm((2, 0, 3, 1))]
+            >>> sum(1 for _ in Perm.simples_of_length(7))
+            338
+            >>> keep = Perm((2, 1, 0)).avoided_by
+            >>> list(Perm.simples_of_length(5, keep))
+            [Perm((1, 3, 0, 4, 2)), Perm((2, 0, 4, 1, 3))]
+        """
+        if length < 4:
+            yield from (
+                perm
+                for perm in cls.of_length(length)
+                if perm.is_simple() and (keep is None or keep(perm))
+            )
+            return
+        level: Set[Perm] = set()
+        for size in range(4, length + 1):
+            level = {ext for perm in level for ext in cls._simple_extensions(perm)}
+            level.update(cls._simple_parallel_alternations(size))
+            if keep is not None:
+                level = set(filter(keep, level))
+        yield from sorted(level)
+
+    def _simple_extensions(self) -> Iterator["Perm"]:
+        """Yield the simple one-point extensions of a simple perm of length at
+        least 4. An interval of the extension, other than the perm itself, can
+        only be the new point with an entry next to it in position and value,
+        or everything but the new point, if it is in a corner."""
+        n = len(self)
+        for idx in range(n + 1):
+            left = self[idx - 1] if idx > 0 else -2
+            right = self[idx] if idx < n else -2
+            for val in range(n + 1):
+                if idx in (0, n) and val in (0, n):
+                    continue
+                if left in (val - 1, val) or right in (val - 1, val):
+                    continue
+                yield self.insert(idx, val)
+
+    @classmethod
+    def _simple_parallel_alternations(cls, length: int) -> Set["Perm"]:
+        """Return the simple perms of the given length with no simple one-point
+        deletion, which are the symmetries of 1 3 5 ... 0 2 4 ... of even length."""
+        if length % 2 or length < 4:
+            return set()
+        perm = cls(itertools.chain(range(1, length, 2), range(0, length, 2)))
+        return set(perm.all_syms())
+
     def children(self) -> List["Perm"]:
         """Returns all patterns of length one less than the permutation. One
         layer of the downset, also called the shadow.
@@ -2501,6 +2991,12 @@ class Perm(Tuple[int], Patt):
         return all(self._contains(patt) for patt in patts)
 
     def _contains(self, patt: "Patt") -> bool:
+        if isinstance(patt, Perm) and len(self) >= KERNEL_MIN_LENGTH:
+            kernel = containment_kernel(patt)
+            if kernel is not None:
+                return kernel(self)
+        if isinstance(patt, Perm):
+            return Perm._matcher(patt).contains(self)
         if isinstance(patt, Patt):
             return any(True for _ in patt.occurrences_in(self))
         raise TypeError("patt must be a Patt")
@@ -2526,6 +3022,19 @@ class Perm(Tuple[int], Patt):
             >>> Perm((5, 3, 0, 4, 2, 1)).avoids(pattern3, pattern4)
             True
         """
+        if len(self) >= KERNEL_MIN_LENGTH:
+            # Patterns with a dedicated kernel are checked without a search
+            remaining = []
+            for patt in patts:
+                kernel = containment_kernel(patt) if isinstance(patt, Perm) else None
+                if kernel is None:
+                    remaining.append(patt)
+                elif kernel(self):
+                    return False
+            patts = tuple(remaining)
+        if len(patts) > 1 and all(isinstance(patt, Perm) for patt in patts):
+            # Search for all the patterns at once
+            return PatternTrie.compile(patts).avoided_by(self)
         return all(not self._contains(patt) for patt in patts)
 
     def avoids_set(self, patts: Iterable["Patt"]) -> bool:
@@ -2552,6 +3061,21 @@ class Perm(Tuple[int], Patt):
 
     occurrences = count_occurrences_of
 
+    def count_occurrences_in(self, patt: "Patt") -> int:
+        """Count the number of occurrences of self in patt. Patterns of length at
+        most 4 and monotone patterns are counted without finding the occurrences.
+
+        Examples:
+            >>> Perm((0, 2, 1)).count_occurrences_in(Perm((0, 3, 1, 2)))
+            2
+            >>> Perm((1, 3, 0, 2)).count_occurrences_in(Perm((2, 4, 0, 3, 1)))
+            1
+        """
+        count = count_occurrences(self, patt.get_perm())
+        if count is None:
+            return super().count_occurrences_in(patt)
+        return count
+
     def occurrences_in(
         self, patt: "Patt", *args, **kwargs
     ) -> Iterator[Tuple[int, ...]]:
@@ -2570,74 +3094,32 @@ class Perm(Tuple[int], Patt):
             [()]
         """
         self_colours, patt_colours = (None, None) if len(args) < 2 else args
-        n, pattern = len(self), patt.get_perm()
+        return Perm._matcher(self).occurrences(patt, self_colours, patt_colours)
 
-        if n == 0:
-            yield ()
-            return
-        if n > len(pattern):
-            return
+    def visit_occurrences_in(
+        self, patt: "Patt", callback: Callable[[List[int]], Optional[bool]]
+    ) -> int:
+        """Call callback with the indices of each occurrence of self in patt and
+        return the number of calls. No tuple is built for an occurrence; the
+        list passed is reused, so copy it to keep it. The search stops as soon as
+        callback returns True.
 
-        # The indices of the occurrence in perm
-        occurrence_indices = [0] * n
-        pattern_details = self._pattern_details()
-
-        # Define function that works with the above defined variables
-        # i is the index of the element in perm that is to be considered
-        # k is how many elements of the perm have already been added to
-        # occurrence
-        def occurrences(i, k):
-            elements_remaining = len(pattern) - i
-            elements_needed = n - k
-
-            # lfi = left floor index
-            # lci = left ceiling index
-            # lbp = lower bound pre-computation
-            # ubp = upper bound pre-computation
-            lfi, lci, lbp, ubp = pattern_details[k]
-
-            # Set the bounds for the new element
-            if lfi == -1:
-                # The new element of the occurrence must be at least self[k];
-                # i.e., the k-th element of the pattern
-                # In this case, lbp = self[k]
-                lower_bound = lbp
-            else:
-                # The new element of the occurrence must be at least as far
-                # from its left floor as self[k] is from its left floor
-                # In this case, lbp = self[k] - self[lfi]
-                occurrence_left_floor = pattern[occurrence_indices[lfi]]
-                lower_bound = occurrence_left_floor + lbp
-            if lci == -1:
-                # The new element of the occurrence must be at least as less
-                # than its maximum possible element---i.e., len(perm)---as
-                # self[k] is to its maximum possible element---i.e., len(self)
-                # In this case, ubp = len(self) - self[k]
-                upper_bound = len(pattern) - ubp
-            else:
-                # The new element of the occurrence must be at least as less
-                # than its left ceiling as self[k] is to its left ceiling
-                # In this case, ubp = self[lci] - self[k]
-                upper_bound = pattern[occurrence_indices[lci]] - ubp
-
-            # Loop over remaining elements of perm (actually i, the index)
-            while True:
-                if elements_remaining < elements_needed:
-                    # Can't form an occurrence with remaining elements
-                    return
-                element = pattern[i]
-                compare_colours = (
-                    self_colours is None or patt_colours[i] == self_colours[k]
-                )
-                if compare_colours and lower_bound <= element <= upper_bound:
-                    occurrence_indices[k] = i
-                    if elements_needed == 1:
-                        yield tuple(occurrence_indices)
-                    else:
-                        yield from occurrences(i + 1, k + 1)
-                i, elements_remaining = i + 1, elements_remaining - 1
+        Examples:
+            >>> Perm((1, 0)).visit_occurrences_in(Perm((1, 2, 3, 0)), print)
+            [0, 3]
+            [1, 3]
+            [2, 3]
+            3
+            >>> Perm((1, 0)).visit_occurrences_in(Perm((1, 2, 3, 0)), bool)
+            1
+        """
+        return Perm._matcher(self).visit(patt, callback)
 
-        yield from occurrences(0, 0)
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _matcher(patt: "Perm") -> PatternMatcher:
+        """A cached function compiling a pattern for occurrence searches."""
+        return PatternMatcher(patt)
 
     def occurrences_of(self, patt: "Patt") -> Union[Iterator[Tuple[int, ...]]]:
         """Find all indices of occurrences of patt in self. This method is complementary
@@ -2658,51 +3140,57 @@ class Perm(Tuple[int], Patt):
 
     def left_floor_and_ceiling(self) -> Iterator[Tuple[int, int]]:
         """For each element, return the pair of indices of (largest less, smalllest
-        greater) to the left, if they exist. If not, -1 is used instead.
+        greater) to the left, if they exist. If not, -1 is used instead. This takes
+        O(n log n) time.
 
         Examples:
             >>> list(Perm((2, 5, 0, 3, 6, 4, 7, 1)).left_floor_and_ceiling())
             [(-1, -1), (0, -1), (-1, 0), (0, 1), (1, -1), (3, 1), (4, -1), (2, 0)]
         """
-        deq: Deque[Tuple[int, int]] = collections.deque()
-        smallest, biggest = -1, -1
-        for idx, val in enumerate(self):
-            if idx == 0:
-                deq.append((val, idx))
-                smallest, biggest = val, val
-                yield (-1, -1)
-            elif val < smallest:
-                # Rotate until smallest val is at front
-                while deq[0][0] != smallest:
-                    deq.rotate(-1)
-                yield (-1, deq[0][1])
-                deq.appendleft((val, idx))
-                smallest = val
-            elif val > biggest:
-                # Rotate until biggest val is at end
-                while deq[-1][0] != biggest:
-                    deq.rotate(-1)
-                yield (deq[-1][1], -1)
-                deq.append((val, idx))
-                biggest = val
-            else:
-                while not deq[-1][0] <= val <= deq[0][0]:
-                    deq.rotate(1)
-                yield (deq[-1][1], deq[0][1])
-                deq.appendleft((val, idx))
+        # The entries at the current index and to its left form a doubly linked
+        # list in increasing order of value. Removing the entries from the right
+        # leaves the neighbours of each entry as its floor and ceiling. The
+        # values need not be 0, ..., n - 1, so the list is over their ranks.
+        n = len(self)
+        below = list(range(-1, n - 1))
+        above = list(range(1, n + 1))
+        index_of = sorted(range(n), key=self.__getitem__)
+        rank = [0] * n
+        for val, idx in enumerate(index_of):
+            rank[idx] = val
+        res: List[Tuple[int, int]] = [(-1, -1)] * n
+        for idx in range(n - 1, -1, -1):
+            val = rank[idx]
+            lower, upper = below[val], above[val]
+            res[idx] = (
+                -1 if lower == -1 else index_of[lower],
+                -1 if upper == n else index_of[upper],
+            )
+            if lower != -1:
+                above[lower] = upper
+            if upper != n:
+                below[upper] = lower
+        return iter(res)
 
     def _pattern_details(self) -> List[Tuple[int, int, int, int]]:
-        if self._cached_pattern_details is None:
-            self._cached_pattern_details = [
-                (
-                    floor,
-                    ceiling,
-                    val if floor == -1 else val - self[floor],
-                    len(self) - val if ceiling == -1 else self[ceiling] - val,
-                )
-                for val, (floor, ceiling) in zip(self, self.left_floor_and_ceiling())
-            ]
-        return self._cached_pattern_details
+        """Return the data used when finding occurrences of self in a perm."""
+        return Perm._compile_pattern(self)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _compile_pattern(patt: "Perm") -> List[Tuple[int, int, int, int]]:
+        """A cached function computing, for each entry of a pattern, the indices
+        of its left floor and ceiling and how far its value is above the floor
+        and below the ceiling."""
+        return [
+            (
+                floor,
+                ceiling,
+                val if floor == -1 else val - patt[floor],
+                len(patt) - val if ceiling == -1 else patt[ceiling] - val,
+            )
+            for val, (floor, ceiling) in zip(patt, patt.left_floor_and_ceiling())
+        ]
 
     def apply(self, iterable: Iterable[ApplyType]) -> Tuple[ApplyType, ...]:
         """Permute an iterable using the perm.
@@ -3007,6 +3495,11 @@ class Perm(Tuple[int], Patt):
             return NotImplemented
         return self.compose(other)
 
+    def __pow__(self, k: object) -> "Perm":
+        if not isinstance(k, numbers.Integral):
+            return NotImplemented
+        return self.power(int(k))
+
     def __repr__(self) -> "str":
         return f"Perm({super().__repr__()})"
 
@@ -3029,6 +3522,11 @@ class Perm(Tuple[int], Patt):
     def __ge__(self, other: tuple) -> bool:
         return other.__le__(self)
 
+    def __setstate__(self, state: Optional[Dict[str, object]]) -> None:
+        # Perms pickled by earlier versions carry their caches as the state,
+        # which is dropped as they are recomputed when needed
+        pass
+
     def __len__(self) -> int:
         return tuple.__len__(self)
 
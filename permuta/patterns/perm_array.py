@@ -0,0 +1,199 @@
+import bisect
+import itertools
+from array import array
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+from .perm import Perm
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore  # pylint: disable=invalid-name
+
+
+class PermArray:
+    """An immutable array of perms of the same length, stored row by row in one
+    contiguous buffer. Perms are only created when they are accessed. Slices
+    with step 1 are views sharing the buffer. When NumPy is installed the
+    symmetries are computed for the whole batch at once.
+
+    Examples:
+        >>> arr = PermArray.of_length(3)
+        >>> len(arr), arr[1]
+        (6, Perm((0, 2, 1)))
+        >>> list(arr[4:].inverse())
+        [Perm((1, 2, 0)), Perm((2, 1, 0))]
+        >>> Perm((2, 0, 1)) in arr
+        True
+    """
+
+    def __init__(
+        self, perms: Iterable[Sequence[int]] = (), length: Optional[int] = None
+    ) -> None:
+        iterator = iter(perms)
+        first = next(iterator, None)
+        if length is None:
+            length = 0 if first is None else len(first)
+        data, count = array(self._typecode(length)), 0
+        if first is not None:
+            for perm in itertools.chain((first,), iterator):
+                if len(perm) != length:
+                    raise ValueError("All perms must have the same length")
+                data.extend(perm)
+                count += 1
+        self._length = length
+        self._count = count
+        self._data = memoryview(data)
+        self._sorted_ranks: Optional[List[int]] = None
+
+    @classmethod
+    def _from_buffer(
+        cls, data: Union[array, memoryview], length: int, count: int
+    ) -> "PermArray":
+        res = cls.__new__(cls)
+        res._length = length
+        res._count = count
+        res._data = memoryview(data)
+        res._sorted_ranks = None
+        return res
+
+    @staticmethod
+    def _typecode(length: int) -> str:
+        return "B" if length <= 256 else "H"
+
+    @classmethod
+    def of_length(cls, length: int) -> "PermArray":
+        """Return all perms of the given length in lexicographical order."""
+        data = array(cls._typecode(length))
+        count = 0
+        for perm in itertools.permutations(range(length)):
+            data.extend(perm)
+            count += 1
+        return cls._from_buffer(data, length, count)
+
+    @property
+    def length(self) -> int:
+        """The length of the perms in the array."""
+        return self._length
+
+    def to_numpy(self) -> Any:
+        """Return a read-only NumPy array of shape (len(self), self.length) viewing
+        the buffer, without copying it."""
+        if np is None:
+            raise ImportError("NumPy is needed for PermArray.to_numpy")
+        res = np.frombuffer(self._data, dtype=self._data.format)
+        res.setflags(write=False)
+        return res.reshape(self._count, self._length)
+
+    def tobytes(self) -> bytes:
+        """Return the buffer as bytes."""
+        return self._data.tobytes()
+
+    def _rows(self) -> Iterator[memoryview]:
+        data, length = self._data, self._length
+        for idx in range(self._count):
+            yield data[idx * length : (idx + 1) * length]
+
+    def _with_rows(
+        self, rows: Iterable[Iterable[int]], count: Optional[int] = None
+    ) -> "PermArray":
+        data = array(self._typecode(self._length))
+        for row in rows:
+            data.extend(row)
+        count = self._count if count is None else count
+        return PermArray._from_buffer(data, self._length, count)
+
+    def _from_numpy(self, arr: Any) -> "PermArray":
+        data = array(self._typecode(self._length))
+        data.frombytes(np.ascontiguousarray(arr, dtype=self._data.format).tobytes())
+        return PermArray._from_buffer(data, self._length, self._count)
+
+    def inverse(self) -> "PermArray":
+        """Return the array of the inverses."""
+        if np is not None:
+            return self._from_numpy(np.argsort(self.to_numpy(), axis=1))
+        return self._with_rows(Perm(row).inverse() for row in self._rows())
+
+    def reverse(self) -> "PermArray":
+        """Return the array of the reverses."""
+        if np is not None:
+            return self._from_numpy(self.to_numpy()[:, ::-1])
+        return self._with_rows(reversed(row) for row in self._rows())
+
+    def complement(self) -> "PermArray":
+        """Return the array of the complements."""
+        top = self._length - 1
+        if np is not None:
+            return self._from_numpy(top - self.to_numpy())
+        return self._with_rows((top - val for val in row) for row in self._rows())
+
+    def rotate(self, times: int = 1) -> "PermArray":
+        """Return the array of the perms rotated times quarter turns clockwise,
+        as in Perm.rotate."""
+        times = times % 4
+        if times == 0:
+            return self
+        if times == 1:
+            return self.inverse().complement()
+        if times == 2:
+            return self.reverse().complement()
+        return self.inverse().reverse()
+
+    def ranks(self) -> List[int]:
+        """Return the ranks of the perms, see Perm.rank."""
+        return Perm.rank_many(Perm(row) for row in self._rows())
+
+    def __contains__(self, perm: object) -> bool:
+        if not isinstance(perm, Perm) or len(perm) != self._length:
+            return False
+        if self._sorted_ranks is None:
+            self._sorted_ranks = sorted(self.ranks())
+        rank = perm.rank()
+        idx = bisect.bisect_left(self._sorted_ranks, rank)
+        return idx < len(self._sorted_ranks) and self._sorted_ranks[idx] == rank
+
+    @overload
+    def __getitem__(self, key: int) -> Perm: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> "PermArray": ...
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Perm, "PermArray"]:
+        length = self._length
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._count)
+            if step == 1:
+                count = max(0, stop - start)
+                view = self._data[start * length : (start + count) * length]
+                return PermArray._from_buffer(view, length, count)
+            indices = range(start, stop, step)
+            return self._with_rows(
+                (self._data[idx * length : (idx + 1) * length] for idx in indices),
+                len(indices),
+            )
+        if key < 0:
+            key += self._count
+        if not 0 <= key < self._count:
+            raise IndexError("PermArray index out of range")
+        return Perm(self._data[key * length : (key + 1) * length])
+
+    def __iter__(self) -> Iterator[Perm]:
+        return (Perm(row) for row in self._rows())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PermArray):
+            return NotImplemented
+        return (
+            self._length == other._length
+            and self._count == other._count
+            and self._data.tobytes() == other._data.tobytes()
+        )
+
+    def __hash__(self) -> int:
+        return hash((self._length, self._count, self._data.tobytes()))
+
+    def __repr__(self) -> str:
+        return f"PermArray({list(self)!r}, length={self._length})"
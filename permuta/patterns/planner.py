@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# For each step of a plan, the steps placing the nearest entries to the left,
+# right, below and above, each followed by how far the entry is from it. The
+# steps len(patt) and len(patt) + 1 stand for the borders of the perm.
+Bound = Tuple[int, int, int, int, int, int, int, int]
+
+# Shorter patterns are found as fast by placing their entries from left to right
+PLANNED_MIN_LENGTH = 4
+
+
+def _gaps(patt: Sequence[int], placed: Sequence[int], idx: int) -> Tuple[int, int]:
+    """The widths of the column and row ranges that the entry at idx of patt is
+    confined to by the placed entries."""
+    length, val = len(patt), patt[idx]
+    left = max((pos for pos in placed if pos < idx), default=-1)
+    right = min((pos for pos in placed if pos > idx), default=length)
+    below = max((patt[pos] for pos in placed if patt[pos] < val), default=-1)
+    above = min((patt[pos] for pos in placed if patt[pos] > val), default=length)
+    return right - left, above - below
+
+
+def embedding_order(patt: Sequence[int], start: Sequence[int] = ()) -> List[int]:
+    """Return the order in which to place the entries of a pattern when looking
+    for an occurrence. Each entry placed is the one most confined by the entries
+    placed before it, so the search prunes early, starting from an entry
+    closest to a corner, or after the entries at the indices in start.
+
+    Examples:
+        >>> embedding_order((3, 1, 2, 0))
+        [0, 3, 1, 2]
+        >>> embedding_order((0, 1, 2))
+        [0, 2, 1]
+        >>> embedding_order((0, 1, 2), (2,))
+        [2, 0, 1]
+    """
+    length = len(patt)
+    placed: List[int] = list(start)
+    remaining = set(range(length)).difference(start)
+
+    def score(idx: int) -> Tuple[int, int, int, int]:
+        cols, rows = _gaps(patt, placed, idx)
+        val = patt[idx]
+        corner = min(idx, length - 1 - idx) + min(val, length - 1 - val)
+        return min(cols, rows), cols * rows, corner, idx
+
+    while remaining:
+        idx = min(remaining, key=score)
+        placed.append(idx)
+        remaining.remove(idx)
+    return placed
+
+
+def plan_bounds(patt: Sequence[int], order: Sequence[int]) -> List[Bound]:
+    """Return the bounds on each entry of an occurrence of patt when its entries
+    are placed in the given order. This generalises Perm._pattern_details,
+    which is for placing them from left to right.
+
+    Examples:
+        >>> plan_bounds((1, 0), (1, 0))
+        [(2, 2, 3, 1, 2, 1, 3, 2), (2, 1, 0, 1, 0, 1, 3, 1)]
+    """
+    length = len(patt)
+    # The index of each value, with the borders mapped to themselves
+    inverse = {val: idx for idx, val in enumerate(patt)}
+    inverse[-1], inverse[length] = -1, length
+    step_of: Dict[int, int] = {}
+    res = []
+    for step, idx in enumerate(order):
+        val = patt[idx]
+        left = max((pos for pos in step_of if pos < idx), default=-1)
+        right = min((pos for pos in step_of if pos > idx), default=length)
+        below = max((patt[pos] for pos in step_of if patt[pos] < val), default=-1)
+        above = min((patt[pos] for pos in step_of if patt[pos] > val), default=length)
+        res.append(
+            (
+                step_of.get(left, length),
+                idx - left,
+                step_of.get(right, length + 1),
+                right - idx,
+                step_of.get(inverse[below], length),
+                val - below,
+                step_of.get(inverse[above], length + 1),
+                above - val,
+            )
+        )
+        step_of[idx] = step
+    return res
+
+
+def planned_contains(
+    bounds: Sequence[Bound], perm: Sequence[int], first: Optional[int] = None
+) -> bool:
+    """Check if perm has an occurrence of the pattern that the bounds were
+    planned for. The search stops at the first occurrence. If first is given,
+    only occurrences where the entry placed first is at that index are found.
+
+    Examples:
+        >>> bounds = plan_bounds((1, 0), (1, 0))
+        >>> planned_contains(bounds, (1, 0, 2)), planned_contains(bounds, (1, 0, 2), 2)
+        (True, False)
+    """
+    # pylint: disable=too-many-locals
+    length, n = len(bounds), len(perm)
+    if length > n:
+        return False
+    if length == 0:
+        return True
+    # The index and value of the entry placed at each step, then the borders
+    indices = [0] * length + [-1, n]
+    values = [0] * length + [-1, n]
+    # The last index and the range of values of the candidates at each step
+    last, lower, upper = [0] * length, [0] * length, [0] * length
+    step = 0
+    left, d_left, right, d_right, below, d_below, above, d_above = bounds[0]
+    idx, stop = indices[left] + d_left, indices[right] - d_right
+    low, high = values[below] + d_below, values[above] - d_above
+    if first is not None:
+        idx, stop = max(idx, first), min(stop, first)
+    while True:
+        while idx <= stop and not low <= perm[idx] <= high:
+            idx += 1
+        if idx > stop:
+            # Backtrack to the next candidate of the previous step
+            step -= 1
+            if step < 0:
+                return False
+            idx, stop = indices[step] + 1, last[step]
+            low, high = lower[step], upper[step]
+            continue
+        if step + 1 == length:
+            return True
+        indices[step], values[step] = idx, perm[idx]
+        last[step], lower[step], upper[step] = stop, low, high
+        step += 1
+        left, d_left, right, d_right, below, d_below, above, d_above = bounds[step]
+        idx, stop = indices[left] + d_left, indices[right] - d_right
+        low, high = values[below] + d_below, values[above] - d_above
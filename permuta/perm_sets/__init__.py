@@ -1,4 +1,6 @@
 from .basis import Basis, MeshBasis
+from .level_store import LevelStore
 from .permset import Av
+from .tree_counter import TreeCounter
 
-__all__ = ["Av", "Basis", "MeshBasis"]
+__all__ = ["Av", "Basis", "LevelStore", "MeshBasis", "TreeCounter"]
@@ -2,6 +2,7 @@ import re
 from typing import Iterable, List, Union
 
 from ..patterns import MeshPatt, Patt, Perm
+from ..patterns.pattern_trie import PatternTrie
 
 
 class Basis(tuple):
@@ -30,11 +31,26 @@ class Basis(tuple):
         if len(patts[0]) == 0:
             return tuple.__new__(cls, (patts[0],))
         new_basis: List[Perm] = []
+        trie = PatternTrie()
         for patt in patts:
-            if patt.avoids(*new_basis):
+            if trie.avoided_by(patt):
                 new_basis.append(patt)
+                trie.add(patt)
         return tuple.__new__(cls, new_basis)
 
+    def compile(self) -> PatternTrie:
+        """Return a matcher that checks containment of every pattern in the basis
+        with a single search.
+
+        Examples:
+            >>> matcher = Basis(Perm((0, 2, 1)), Perm((2, 1, 0))).compile()
+            >>> matcher.avoided_by(Perm((1, 2, 0, 3)))
+            True
+            >>> matcher.contained_in(Perm((1, 3, 0, 2)))
+            True
+        """
+        return PatternTrie.compile(self)
+
     def __eq__(self, other: object) -> bool:
         return isinstance(other, self.__class__) and tuple.__eq__(self, other)
 
@@ -85,11 +101,18 @@ class MeshBasis(tuple):
         if len(patts[0]) == 0:
             return tuple.__new__(cls, (patts[0],))
         new_basis: List[MeshPatt] = []
+        trie = PatternTrie()
         for patt in patts:
-            if patt.avoids(*new_basis):
+            if trie.avoided_by(patt):
                 new_basis.append(patt)
+                trie.add(patt)
         return tuple.__new__(cls, new_basis)
 
+    def compile(self) -> PatternTrie:
+        """Return a matcher that checks containment of every pattern in the basis
+        with a single search."""
+        return PatternTrie.compile(self)
+
     def __eq__(self, other: object) -> bool:
         return isinstance(other, self.__class__) and tuple.__eq__(self, other)
 
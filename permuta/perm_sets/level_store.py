@@ -0,0 +1,90 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+from ..patterns import Perm
+from .basis import Basis
+
+# Each level of a class is kept in its own file, with one record for each perm
+# of the level in the order of the level. The record of a perm of length n is
+# its entries, one byte each, followed by its spots as a bitmask of n + 1 bits,
+# stored little-endian in the fewest whole bytes.
+MAX_STORED_LEVEL = 255
+
+
+class LevelStore:
+    """A directory in which the levels of permutation classes with a classical
+    basis are kept between processes. Each class is stored under a name derived
+    from its basis, so a class is found again however its basis was given."""
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+
+    def _class_directory(self, basis: Basis) -> Path:
+        text = ",".join("".join(f"{val}." for val in patt) for patt in basis)
+        return self.directory / hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def _width(level: int) -> int:
+        return level // 8 + 1
+
+    def load(
+        self, basis: Basis, max_level: int, start: int = 0
+    ) -> List[Tuple[List[Perm], List[int]]]:
+        """Return the perms of each stored level of the class, from level start up
+        to the deepest stored level or max_level, with the bitmasks of their
+        spots. Use LevelStore.spots to turn a bitmask into a list."""
+        class_directory = self._class_directory(basis)
+        res: List[Tuple[List[Perm], List[int]]] = []
+        for level in range(start, min(max_level, MAX_STORED_LEVEL) + 1):
+            path = class_directory / f"{level}.bin"
+            if not path.is_file():
+                break
+            data = path.read_bytes()
+            size = level + self._width(level)
+            if len(data) % size:
+                break
+            starts = range(0, len(data), size)
+            perms = [Perm(data[idx : idx + level]) for idx in starts]
+            masks = [
+                int.from_bytes(data[idx + level : idx + size], "little")
+                for idx in starts
+            ]
+            res.append((perms, masks))
+        return res
+
+    @staticmethod
+    def spots(mask: int) -> List[int]:
+        """Return the spots in a bitmask, in increasing order.
+
+        Examples:
+            >>> LevelStore.spots(0b1101)
+            [0, 2, 3]
+        """
+        return [val for val in range(mask.bit_length()) if mask >> val & 1]
+
+    def save(
+        self, basis: Basis, level: int, items: Iterable[Tuple[Perm, List[int]]]
+    ) -> None:
+        """Store the perms of a level of the class with their spots. The file is
+        written under a temporary name and then moved into place, so other
+        processes never see a partial level."""
+        if level > MAX_STORED_LEVEL:
+            return
+        class_directory = self._class_directory(basis)
+        class_directory.mkdir(parents=True, exist_ok=True)
+        path = class_directory / f"{level}.bin"
+        if path.is_file():
+            return
+        width = self._width(level)
+        data = b"".join(
+            bytes(perm) + sum(1 << val for val in set(spots)).to_bytes(width, "little")
+            for perm, spots in items
+        )
+        temporary = class_directory / f"{level}.bin.{os.getpid()}"
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+    def __repr__(self) -> str:
+        return f"LevelStore({str(self.directory)!r})"
@@ -1,11 +1,93 @@
+import functools
 import multiprocessing
 from itertools import islice
-from typing import ClassVar, Dict, Iterable, List, NamedTuple, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 
 from ..patterns import MeshPatt, Perm
 from ..permutils import is_finite, is_insertion_encodable, is_polynomial
 from ..permutils.pin_words import PinWords
 from .basis import Basis, MeshBasis
+from .level_store import LevelStore
+from .tree_counter import TreeCounter
+
+# Levels with fewer perms than this are built in a single process
+_PARALLEL_MIN_LEVEL_SIZE = 20000
+# The number of chunks a level is split into for each process
+_CHUNKS_PER_JOB = 4
+# New perms are sent back from the processes with one byte for each entry
+_MAX_PARALLEL_LENGTH = 256
+# Perms of at least this length are tested against the basis instead of being
+# looked up in their level, unless it is cached, as building it would take long
+_DIRECT_MEMBERSHIP_LENGTH = 9
+# The number of perms tested against the basis whose answer is kept per class
+_MEMBERSHIP_CACHE_SIZE = 4096
+# The level below the one being extended, the length of the longest basis
+# element and the basis elements of the length of the new level, set in each
+# worker process by _init_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _valid_insertions(
+    perm: Perm, below: Dict[Perm, Optional[List[int]]], max_size: int
+) -> Iterable[int]:
+    """The values that can be added at the end of perm, a perm in the class, for
+    the new perm to be in the class. These are the values allowed by the spots
+    of the perms of the level below got by removing one of the last entries."""
+    n = len(perm)
+    res = None
+    for i in range(max(0, n - max_size), n):
+        val = perm[i]
+        subperm = perm.remove(i)
+        spots = below[subperm]
+        assert spots is not None
+        acceptable = [k for k in spots if k <= val]
+        acceptable.extend(k + 1 for k in spots if k >= val)
+        if res is None:
+            res = frozenset(acceptable)
+        res = res.intersection(acceptable)
+        if not res:
+            break
+    return res if res is not None else range(n + 1)
+
+
+def _init_worker(
+    below: Dict[Perm, Optional[List[int]]], max_size: int, smaller_elems: Set[Perm]
+) -> None:
+    _WORKER_STATE["below"] = below
+    _WORKER_STATE["max_size"] = max_size
+    _WORKER_STATE["smaller_elems"] = smaller_elems
+
+
+def _extend_chunk(perms: List[Perm]) -> Tuple[List[List[int]], bytes]:
+    """The spots of each perm in a chunk of a level, and the entries of the new
+    perms they give, as bytes in order, to be sent back to the main process."""
+    below, max_size = _WORKER_STATE["below"], _WORKER_STATE["max_size"]
+    smaller_elems = _WORKER_STATE["smaller_elems"]
+    spots = []
+    new_perms = []
+    for perm in perms:
+        values = []
+        for value in _valid_insertions(perm, below, max_size):
+            new_perm = perm.insert(index=len(perm) + 1, new_element=value)
+            if new_perm not in smaller_elems:
+                values.append(value)
+                new_perms.append(bytes(new_perm))
+        spots.append(values)
+    return spots, b"".join(new_perms)
 
 
 class AvBase(NamedTuple):
@@ -25,6 +107,14 @@ class Av(AvBase):
     _BASIS_ONLY_MSG = "Only supported for Basis!"
     _CLASS_CACHE: ClassVar[Dict[Union[Basis, MeshBasis], "Av"]] = {}
     _CACHE_LOCK = multiprocessing.Lock()
+    _LEVEL_STORE: ClassVar[Optional[LevelStore]] = None
+    # The classes for which the store was found to miss a level
+    _STORE_EXHAUSTED: ClassVar[Set[Basis]] = set()
+    # The spots, as bitmasks, of the last level in the cache of each class that
+    # was read from the store
+    _STORE_LAST_MASKS: ClassVar[Dict[Basis, List[int]]] = {}
+    _JOBS: ClassVar[int] = 1
+    _MEMBERSHIP: ClassVar[Dict[Union[Basis, MeshBasis], Callable[[Perm], bool]]] = {}
 
     def __new__(
         cls,
@@ -50,6 +140,31 @@ class Av(AvBase):
     def clear_cache(cls) -> None:
         """Clear the instance cache."""
         cls._CLASS_CACHE = {}
+        cls._MEMBERSHIP = {}
+        cls._STORE_EXHAUSTED = set()
+        cls._STORE_LAST_MASKS = {}
+
+    @classmethod
+    def set_level_store(cls, store: Optional[LevelStore]) -> None:
+        """Keep the levels of classes with a classical basis in a store, or stop
+        doing so if store is None. Levels are then loaded from the store rather
+        than built, and each level built is saved to it."""
+        cls._LEVEL_STORE = store
+        cls._STORE_EXHAUSTED = set()
+        cls._STORE_LAST_MASKS = {}
+
+    @classmethod
+    def set_jobs(cls, jobs: int) -> None:
+        """Set the number of processes used to build the large levels of classes
+        with a classical basis. The levels are the same, in the same order, for
+        any number of processes.
+
+        This is experimental: no speedup over a single process has been
+        measured. A new pool is started for each level, and the level below is
+        sent to every process, so on a single core it is slower."""
+        if jobs < 1:
+            raise ValueError("The number of jobs must be positive")
+        cls._JOBS = jobs
 
     @classmethod
     def from_string(cls, basis) -> "Av":
@@ -97,6 +212,21 @@ class Av(AvBase):
             or PinWords.has_finite_simples(self.basis)
         )
 
+    def simples_of_length(self, length: int) -> Iterable[Perm]:
+        """Generate the simple perms of a given length in the perm class, in
+        lexicographical order. Simples containing a basis element are pruned as
+        soon as they are generated, so none of their extensions are built.
+
+        Examples:
+            >>> list(Av.from_string("321").simples_of_length(5))
+            [Perm((1, 3, 0, 4, 2)), Perm((2, 0, 4, 1, 3))]
+            >>> sum(1 for _ in Av.from_string("2413_3142").simples_of_length(9))
+            0
+        """
+        if isinstance(self.basis, MeshBasis):
+            raise NotImplementedError(Av._BASIS_ONLY_MSG)
+        return Perm.simples_of_length(length, self.basis.compile().avoided_by)
+
     def first(self, count: int) -> Iterable[Perm]:
         """Generate the first `count` permutation in this permutation class given
         that it has that many, if not all are generated.
@@ -109,6 +239,26 @@ class Av(AvBase):
         """
         return iter(self._get_level(length))
 
+    def iter_length(self, length: int, store: bool = False) -> Iterator[Perm]:
+        """Generate all perms of a given length that belong to this permutation
+        class. Unless store is True or the level is cached, the perms are
+        generated depth first without building the levels, so memory does not
+        grow with the size of the level, and they come in a different order
+        than from of_length.
+
+        Examples:
+            >>> sorted(Av.from_string("012_210").iter_length(4))
+            [Perm((1, 0, 3, 2)), Perm((1, 3, 0, 2)), Perm((2, 0, 3, 1)), \
+Perm((2, 3, 0, 1))]
+        """
+        if store or len(self.cache) > length:
+            yield from self.of_length(length)
+        elif isinstance(self.basis, MeshBasis):
+            matcher = self.basis.compile()
+            yield from (p for p in Perm.of_length(length) if matcher.avoided_by(p))
+        else:
+            yield from TreeCounter(self.basis, length).perms()
+
     def up_to_length(self, length: int) -> Iterable[Perm]:
         """Generate all perms up to and including a given length that
         belong to this permutation class.
@@ -116,33 +266,119 @@ class Av(AvBase):
         for n in range(length + 1):
             yield from self.of_length(n)
 
-    def count(self, length: int) -> int:
-        """Return the nubmber of permutations of a given length."""
+    def count(self, length: int, count_only: bool = False) -> int:
+        """Return the number of permutations of a given length. If count_only is
+        True and the level is not cached, the class is counted with a
+        TreeCounter, which does not keep the levels.
+
+        Examples:
+            >>> Av.from_string("1324").count(7, count_only=True)
+            2762
+        """
+        if count_only and len(self.cache) <= length:
+            if isinstance(self.basis, MeshBasis):
+                raise NotImplementedError(Av._BASIS_ONLY_MSG)
+            counter = TreeCounter(self.basis, length)
+            counter.run()
+            return counter.total
         return len(self._get_level(length))
 
-    def enumeration(self, length: int) -> List[int]:
+    def enumeration(self, length: int, count_only: bool = False) -> List[int]:
         """Return the enumeration of this permutation class up and including a given
         length."""
-        return [self.count(i) for i in range(length + 1)]
+        return [self.count(i, count_only) for i in range(length + 1)]
 
     def __contains__(self, other: object):
-        if isinstance(other, Perm):
+        if not isinstance(other, Perm):
+            return False
+        if len(other) < _DIRECT_MEMBERSHIP_LENGTH or len(self.cache) > len(other):
             return other in self._get_level(len(other))
-        return False
+        return self._avoids_basis(other)
+
+    def _avoids_basis(self, perm: Perm) -> bool:
+        """Test a perm against the basis with a compiled matcher, remembering the
+        answers for the most recent perms."""
+        avoided_by = Av._MEMBERSHIP.get(self.basis)
+        if avoided_by is None:
+            avoided_by = functools.lru_cache(maxsize=_MEMBERSHIP_CACHE_SIZE)(
+                self.basis.compile().avoided_by
+            )
+            Av._MEMBERSHIP[self.basis] = avoided_by
+        return avoided_by(perm)
 
     def is_subclass(self, other: "Av"):
         """Check if a sublcass of another permutation class."""
         return all(p1 not in self for p1 in other.basis)
 
     def _ensure_level(self, level_number: int) -> None:
+        basis, store = self.basis, Av._LEVEL_STORE
+        if store is not None and isinstance(basis, Basis):
+            self._load_levels(store, basis, level_number)
         start = max(0, len(self.cache) - 2)
-        if isinstance(self.basis, Basis):
+        if isinstance(basis, Basis):
             self._ensure_level_classical_pattern_basis(level_number)
         else:
             self._ensure_level_mesh_pattern_basis(level_number)
+        if store is not None and isinstance(basis, Basis):
+            # The spots of all but the last level are now complete
+            for i in range(start, len(self.cache) - 1):
+                items = cast(Dict[Perm, List[int]], self.cache[i]).items()
+                store.save(basis, i, items)
         for i in range(start, level_number - 1):
             self.cache[i] = {perm: None for perm in self.cache[i]}
 
+    def _load_levels(self, store: LevelStore, basis: Basis, level_number: int) -> None:
+        """Extend the cache with the levels in the store, if it has more of the
+        levels up to level_number. If the store does not have the last level,
+        it is made from the spots of the deepest stored level. Each file is read
+        at most once for the class: only the levels after the cache are read,
+        the spots of the last level read are kept until the next levels are,
+        and once a level is missing the store is not read again."""
+        if len(self.cache) > level_number or basis in Av._STORE_EXHAUSTED:
+            return
+        first = len(self.cache)
+        stored = store.load(basis, level_number, first)
+        # The spots of the last level in the cache, if it was read from the store
+        masks = Av._STORE_LAST_MASKS.pop(basis, None)
+        if first + len(stored) <= level_number:
+            Av._STORE_EXHAUSTED.add(basis)
+        if not stored:
+            return
+        levels: List[Dict[Perm, Optional[List[int]]]] = [
+            dict.fromkeys(perms) for perms, _ in stored
+        ]
+        if len(stored) > level_number - first:
+            # The spots of the last level are filled in when the next level is
+            # built, or when it is read from the store
+            Av._STORE_LAST_MASKS[basis] = stored[-1][1]
+            levels[-1] = {perm: [] for perm in stored[-1][0]}
+            stored.pop()
+        else:
+            # Inserting value at the end of a perm shifts the larger values up,
+            # which is done on the bytes of the perm with a translation table
+            tables = [
+                bytes(val + (val >= value) for val in range(255)) + b"\xff"
+                for value in range(first + len(stored))
+            ]
+            perms, last_masks = stored[-1]
+            levels.append(
+                {
+                    Perm(bytes(perm).translate(tables[value]) + bytes((value,))): []
+                    for perm, mask in zip(perms, last_masks)
+                    for value in LevelStore.spots(mask)
+                }
+            )
+        if stored:
+            perms, last_masks = stored[-1]
+            levels[len(stored) - 1] = {
+                perm: LevelStore.spots(mask) for perm, mask in zip(perms, last_masks)
+            }
+        elif masks is not None:
+            below = self.cache[-1]
+            for perm, mask in zip(below, masks):
+                below[perm] = LevelStore.spots(mask)
+        self.cache.extend(levels)
+
     def _ensure_level_classical_pattern_basis(self, level_number: int) -> None:
         # We build new elements from existing ones
         lengths = {len(b) for b in self.basis}
@@ -153,26 +389,19 @@ class Av(AvBase):
             last_level = self.cache[-1]
             check_length = nplusone in lengths
             smaller_elems = {b for b in self.basis if len(b) == nplusone}
-
-            def valid_insertions(perm):
-                # pylint: disable=cell-var-from-loop
-                res = None
-                for i in range(max(0, n - max_size), n):
-                    val = perm[i]
-                    subperm = perm.remove(i)
-                    spots = self.cache[n - 1][subperm]
-                    assert spots is not None
-                    acceptable = [k for k in spots if k <= val]
-                    acceptable.extend(k + 1 for k in spots if k >= val)
-                    if res is None:
-                        res = frozenset(acceptable)
-                    res = res.intersection(acceptable)
-                    if not res:
-                        break
-                return res if res is not None else range(nplusone)
-
+            below = self.cache[n - 1] if n > 0 else {}
+            if (
+                Av._JOBS > 1
+                and len(last_level) >= _PARALLEL_MIN_LEVEL_SIZE
+                and nplusone <= _MAX_PARALLEL_LENGTH
+            ):
+                self._extend_level_in_parallel(
+                    last_level, new_level, below, max_size, smaller_elems
+                )
+                self.cache.append(new_level)
+                continue
             for perm, lis in last_level.items():
-                for value in valid_insertions(perm):
+                for value in _valid_insertions(perm, below, max_size):
                     new_perm = perm.insert(index=nplusone, new_element=value)
                     if not check_length or new_perm not in smaller_elems:
                         new_level[new_perm] = []
@@ -180,9 +409,41 @@ class Av(AvBase):
                         lis.append(value)
             self.cache.append(new_level)
 
+    @staticmethod
+    def _extend_level_in_parallel(
+        last_level: Dict[Perm, Optional[List[int]]],
+        new_level: Dict[Perm, Optional[List[int]]],
+        below: Dict[Perm, Optional[List[int]]],
+        max_size: int,
+        smaller_elems: Set[Perm],
+    ) -> None:
+        """Fill in the spots of the last level and the perms of the new level
+        with a pool of processes, each extending a chunk of the last level. The
+        chunks are merged in order, so the levels are the same as when they
+        are built in a single process."""
+        # pylint: disable=too-many-locals
+        jobs = Av._JOBS
+        perms = list(last_level)
+        size = -(-len(perms) // (_CHUNKS_PER_JOB * jobs))
+        chunks = [perms[start : start + size] for start in range(0, len(perms), size)]
+        length = len(perms[0]) + 1
+        initargs = (below, max_size, smaller_elems)
+        with multiprocessing.Pool(jobs, _init_worker, initargs) as pool:
+            for chunk, (spots, data) in zip(chunks, pool.imap(_extend_chunk, chunks)):
+                for perm, values in zip(chunk, spots):
+                    lis = last_level[perm]
+                    assert lis is not None
+                    lis.extend(values)
+                new_perms = map(
+                    Perm,
+                    (data[pos : pos + length] for pos in range(0, len(data), length)),
+                )
+                new_level.update((new_perm, []) for new_perm in new_perms)
+
     def _ensure_level_mesh_pattern_basis(self, level_number: int) -> None:
+        matcher = self.basis.compile()
         self.cache.extend(
-            {p: None for p in Perm.of_length(i) if p.avoids(*self.basis)}
+            {p: None for p in Perm.of_length(i) if matcher.avoided_by(p)}
             for i in range(len(self.cache), level_number + 1)
         )
 
@@ -0,0 +1,164 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from ..patterns import Perm
+from ..patterns.planner import Bound, embedding_order, plan_bounds, planned_contains
+from .basis import Basis
+
+# The number of perms counted so far and the values added at the end of each
+# perm on the path from the empty perm to the next perm to visit
+Frontier = Tuple[int, Tuple[int, ...]]
+
+
+class TreeCounter:
+    """Count the perms of a length in a class with a classical basis without
+    keeping its levels. The perms of the class form a tree, where the children
+    of a perm are got by adding a value at its end, and the tree is walked
+    depth first. Only the perms on the current path and their spots, the values
+    that can be added at their end, are kept, so the memory used is bounded by
+    the square of the length. The walk can be stopped and resumed later from
+    its frontier.
+
+    Examples:
+        >>> counter = TreeCounter(Basis.from_string("021"), 6)
+        >>> counter.run(max_nodes=10)
+        False
+        >>> resumed = TreeCounter(Basis.from_string("021"), 6, counter.frontier)
+        >>> resumed.run(), resumed.total
+        (True, 132)
+    """
+
+    def __init__(
+        self, basis: Basis, length: int, frontier: Optional[Frontier] = None
+    ) -> None:
+        if length < 0:
+            raise ValueError("The length must be non-negative")
+        self.basis = basis
+        self.length = length
+        # A perm added to the tree avoids the basis if its parent does and no
+        # occurrence uses its last entry, so each basis element is planned to
+        # be placed from its last entry
+        self._plans: List[List[Bound]] = [
+            plan_bounds(patt, embedding_order(patt, (len(patt) - 1,))) for patt in basis
+        ]
+        self.total = 0
+        # The perms on the path, with their spots and the number of their
+        # children visited
+        self._perms: List[Tuple[int, ...]] = []
+        self._spots: List[List[int]] = []
+        self._visited: List[int] = []
+        if length == 0:
+            self.total = 1
+            return
+        self._push((), [0])
+        if frontier is not None:
+            self.total, path = frontier
+            for value in path:
+                if len(self._perms) == length or value not in self._spots[-1]:
+                    raise ValueError(f"The frontier {frontier} is not in the tree")
+                self._visited[-1] = self._spots[-1].index(value) + 1
+                self._push(self._perms[-1], self._spots[-1], value)
+
+    def _push(
+        self,
+        parent: Tuple[int, ...],
+        parent_spots: Sequence[int],
+        value: Optional[int] = None,
+    ) -> None:
+        """Add the child of the parent that has value added at its end to the
+        path, or the parent itself if value is None. A value can be added to
+        the child only if it can be added to the parent, which is the child
+        without its last entry, so only those values are checked against the
+        basis."""
+        perm, candidates = parent, list(parent_spots)
+        if value is not None:
+            perm = self._extend(parent, value)
+            candidates = [k for k in parent_spots if k <= value]
+            candidates.extend(k + 1 for k in parent_spots if k >= value)
+        spots = []
+        for k in candidates:
+            child = self._extend(perm, k)
+            if not any(
+                planned_contains(plan, child, len(perm)) for plan in self._plans
+            ):
+                spots.append(k)
+        self._perms.append(perm)
+        self._spots.append(spots)
+        self._visited.append(0)
+
+    @staticmethod
+    def _extend(perm: Tuple[int, ...], value: int) -> Tuple[int, ...]:
+        return tuple(val + (val >= value) for val in perm) + (value,)
+
+    def run(self, max_nodes: Optional[int] = None) -> bool:
+        """Walk the tree, counting the perms of the length in total, and return
+        True once the count is complete. If max_nodes is given, the walk stops
+        after that many perms are added to the path and False is returned. The
+        walk goes on from where it stopped when run is called again."""
+        for _, spots in self._walk(max_nodes):
+            # The children of a perm of length one less are counted from its
+            # spots without visiting them
+            self.total += len(spots)
+        return not self._perms
+
+    def perms(self) -> Iterator[Perm]:
+        """Generate the perms of the length that are not counted yet, adding
+        them to total, in the order of the walk.
+
+        Examples:
+            >>> [str(perm) for perm in TreeCounter(Basis.from_string("012"), 3).perms()]
+            ['210', '201', '102', '120', '021']
+        """
+        if self.length == 0:
+            yield Perm()
+            return
+        extend = self._extend
+        for perm, spots in self._walk(None):
+            for value in spots:
+                self.total += 1
+                yield Perm(extend(perm, value))
+
+    def _walk(
+        self, max_nodes: Optional[int]
+    ) -> Iterator[Tuple[Tuple[int, ...], List[int]]]:
+        """Walk the tree from the frontier, yielding each perm of length one
+        less than the length with its spots, and stop after max_nodes perms
+        are added to the path."""
+        length, perms, spots, visited = (
+            self.length,
+            self._perms,
+            self._spots,
+            self._visited,
+        )
+        if max_nodes is not None and max_nodes <= 0:
+            return
+        added = 0
+        while perms:
+            if len(perms) == length or visited[-1] == len(spots[-1]):
+                if len(perms) == length:
+                    yield perms[-1], spots[-1]
+                perms.pop()
+                spots.pop()
+                visited.pop()
+                continue
+            value = spots[-1][visited[-1]]
+            visited[-1] += 1
+            self._push(perms[-1], spots[-1], value)
+            added += 1
+            if added == max_nodes:
+                return
+
+    @property
+    def frontier(self) -> Optional[Frontier]:
+        """Where the walk stopped, to be passed to a new counter to resume it,
+        or None if the count is complete."""
+        if not self._perms:
+            return None
+        # The last perm on the path has none of its children visited
+        path = tuple(
+            spots[visited - 1]
+            for spots, visited in zip(self._spots[:-1], self._visited[:-1])
+        )
+        return self.total, path
+
+    def __repr__(self) -> str:
+        return f"TreeCounter({self.basis!r}, {self.length})"
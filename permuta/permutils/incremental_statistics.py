@@ -0,0 +1,189 @@
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from permuta.patterns import Perm
+
+# The change in a statistic when the entries at idx and idx + 1 of a perm are
+# swapped, given the perm and its inverse before the swap
+Delta = Callable[[List[int], List[int], int], int]
+
+
+def _inversions(perm: List[int], _inverse: List[int], idx: int) -> int:
+    return 1 if perm[idx] < perm[idx + 1] else -1
+
+
+def _non_inversions(perm: List[int], inverse: List[int], idx: int) -> int:
+    return -_inversions(perm, inverse, idx)
+
+
+def _descents(perm: List[int], _inverse: List[int], idx: int) -> int:
+    fst, snd = perm[idx], perm[idx + 1]
+    res = 1 if fst < snd else -1
+    if idx > 0:
+        left = perm[idx - 1]
+        res += (left > snd) - (left > fst)
+    if idx + 2 < len(perm):
+        right = perm[idx + 2]
+        res += (fst > right) - (snd > right)
+    return res
+
+
+def _ascents(perm: List[int], inverse: List[int], idx: int) -> int:
+    return -_descents(perm, inverse, idx)
+
+
+def _major_index(perm: List[int], _inverse: List[int], idx: int) -> int:
+    fst, snd = perm[idx], perm[idx + 1]
+    res = idx + 1 if fst < snd else -idx - 1
+    if idx > 0:
+        left = perm[idx - 1]
+        res += idx * ((left > snd) - (left > fst))
+    if idx + 2 < len(perm):
+        right = perm[idx + 2]
+        res += (idx + 2) * ((fst > right) - (snd > right))
+    return res
+
+
+def _count_peaks(window: List[int]) -> int:
+    return sum(
+        window[pos - 1] < window[pos] > window[pos + 1]
+        for pos in range(1, len(window) - 1)
+    )
+
+
+def _count_valleys(window: List[int]) -> int:
+    return sum(
+        window[pos - 1] > window[pos] < window[pos + 1]
+        for pos in range(1, len(window) - 1)
+    )
+
+
+def _windowed(count: Callable[[List[int]], int]) -> Delta:
+    """The change in a count of entries depending only on their neighbours,
+    which is found in the entries at most two steps from the swap."""
+
+    def delta(perm: List[int], _inverse: List[int], idx: int) -> int:
+        start = max(idx - 2, 0)
+        window = perm[start : idx + 4]
+        before = count(window)
+        pos = idx - start
+        window[pos], window[pos + 1] = window[pos + 1], window[pos]
+        return count(window) - before
+
+    return delta
+
+
+def _fixed_points(perm: List[int], _inverse: List[int], idx: int) -> int:
+    fst, snd = perm[idx], perm[idx + 1]
+    return (snd == idx) + (fst == idx + 1) - (fst == idx) - (snd == idx + 1)
+
+
+def _depth(perm: List[int], _inverse: List[int], idx: int) -> int:
+    fst, snd = perm[idx], perm[idx + 1]
+    return (
+        max(snd - idx, 0)
+        + max(fst - idx - 1, 0)
+        - max(fst - idx, 0)
+        - max(snd - idx - 1, 0)
+    )
+
+
+def _cyclic(test: Callable[[int, int, int], bool]) -> Delta:
+    """The change in the number of indices i for which test(i, p(i), p(p(i)))
+    is true. Only the indices of the swap and the indices mapped to them can
+    change."""
+
+    def delta(perm: List[int], inverse: List[int], idx: int) -> int:
+        def swapped(val: int) -> int:
+            if val == idx:
+                return perm[idx + 1]
+            if val == idx + 1:
+                return perm[idx]
+            return perm[val]
+
+        res = 0
+        for pos in set((idx, idx + 1, inverse[idx], inverse[idx + 1])):
+            res -= test(pos, perm[pos], perm[perm[pos]])
+            image = swapped(pos)
+            res += test(pos, image, swapped(image))
+        return res
+
+    return delta
+
+
+INCREMENTAL_STATISTICS: Dict[Callable[[Perm], int], Delta] = {
+    Perm.count_inversions: _inversions,
+    Perm.count_non_inversions: _non_inversions,
+    Perm.major_index: _major_index,
+    Perm.count_descents: _descents,
+    Perm.count_ascents: _ascents,
+    Perm.count_peaks: _windowed(_count_peaks),
+    Perm.count_valleys: _windowed(_count_valleys),
+    Perm.count_fixed_points: _fixed_points,
+    Perm.depth: _depth,
+    Perm.count_cyclic_peaks: _cyclic(lambda i, val, image: i < val > image),
+    Perm.count_cyclic_valleys: _cyclic(lambda i, val, image: i > val < image),
+    Perm.count_double_excedance: _cyclic(lambda i, val, image: i < val < image),
+    Perm.count_double_drops: _cyclic(lambda i, val, image: i > val > image),
+}
+
+
+class StatisticsTracker:
+    """Keep the values of some statistics of a perm up to date while adjacent
+    entries of the perm are swapped, in constant time per swap. The statistics
+    must be keys of INCREMENTAL_STATISTICS.
+
+    Examples:
+        >>> tracker = StatisticsTracker(
+        ...     Perm((2, 0, 1)), (Perm.count_inversions, Perm.major_index)
+        ... )
+        >>> tracker.values
+        [2, 1]
+        >>> tracker.swap(1)
+        >>> tracker.perm(), tracker.values
+        (Perm((2, 1, 0)), [3, 3])
+    """
+
+    def __init__(self, perm: Perm, funcs: Sequence[Callable[[Perm], int]]) -> None:
+        for func in funcs:
+            if not self.supports(func):
+                raise ValueError(f"{func.__name__} can not be updated incrementally")
+        self._perm = list(perm)
+        self._inverse = list(perm.inverse())
+        self._deltas = [INCREMENTAL_STATISTICS[func] for func in funcs]
+        self.values: List[int] = [func(perm) for func in funcs]
+
+    @staticmethod
+    def supports(func: Callable[[Perm], int]) -> bool:
+        """Check if a statistic can be updated incrementally."""
+        return func in INCREMENTAL_STATISTICS
+
+    def perm(self) -> Perm:
+        """Return the current perm."""
+        return Perm(self._perm)
+
+    def swap(self, idx: int) -> None:
+        """Swap the entries at idx and idx + 1 and update the values."""
+        perm, inverse, values = self._perm, self._inverse, self.values
+        for pos, delta in enumerate(self._deltas):
+            values[pos] += delta(perm, inverse, idx)
+        fst, snd = perm[idx], perm[idx + 1]
+        perm[idx], perm[idx + 1] = snd, fst
+        inverse[fst], inverse[snd] = idx + 1, idx
+
+
+def gray_code_values(
+    length: int, funcs: Sequence[Callable[[Perm], int]]
+) -> Iterator[Tuple[int, ...]]:
+    """Yield the values of the statistics for all perms of the given length, in
+    the order of Perm.of_length_gray, in amortised constant time per perm.
+
+    Examples:
+        >>> list(gray_code_values(3, (Perm.count_inversions,)))
+        [(0,), (1,), (2,), (3,), (2,), (1,)]
+    """
+    tracker = StatisticsTracker(Perm(range(length)), funcs)
+    values = tracker.values
+    yield tuple(values)
+    for idx in Perm.gray_swaps(length):
+        tracker.swap(idx)
+        yield tuple(values)
@@ -1,12 +1,39 @@
 from collections import defaultdict
 from itertools import combinations, permutations, product
-from typing import Callable, Counter, Dict, Iterator, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
 
 from permuta import Av, Perm
+from permuta.patterns import PermArray
+
+from .incremental_statistics import StatisticsTracker, gray_code_values
+
+try:
+    import numpy as np
+
+    from .vectorised_statistics import VECTORISED_STATISTICS
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore  # pylint: disable=invalid-name
+    VECTORISED_STATISTICS = {}
 
 PermutationStatisticType = Callable[[Perm], int]
 BijectionType = Dict[Perm, Perm]
 
+# Above this length, the distribution of a statistic that can be updated
+# incrementally over all perms is found by walking through them in a Gray code
+# order, rather than holding them all in an array
+_GRAY_CODE_MIN_LENGTH = 10
+
 
 def _count_descents(perm: Perm) -> int:
     return perm.count_descents()
@@ -16,6 +43,48 @@ def _count_ascents(perm: Perm) -> int:
     return perm.count_ascents()
 
 
+_WRAPPED: Dict[PermutationStatisticType, PermutationStatisticType] = {
+    _count_descents: Perm.count_descents,
+    _count_ascents: Perm.count_ascents,
+}
+
+
+def _vectorised(func: PermutationStatisticType) -> Optional[Callable[[Any], Any]]:
+    """The NumPy version of a statistic taking a 2-D array of perms, if any."""
+    return VECTORISED_STATISTICS.get(_WRAPPED.get(func, func))
+
+
+class _StatisticColumns:
+    """The values of some statistics on perms of the same length, the column of
+    each statistic computed the first time it is asked for. The statistics
+    with a vectorised version are computed for all perms at once."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(
+        self, funcs: Sequence[PermutationStatisticType], perms: List[Perm], length: int
+    ) -> None:
+        self._funcs = funcs
+        self._perms = perms
+        self._length = length
+        self._rows: Any = None
+        self._columns: Dict[int, List[int]] = {}
+
+    def __getitem__(self, idx: int) -> List[int]:
+        column = self._columns.get(idx)
+        if column is None:
+            func = self._funcs[idx]
+            vectorised = _vectorised(func)
+            if vectorised is None:
+                column = [func(perm) for perm in self._perms]
+            else:
+                if self._rows is None:
+                    self._rows = PermArray(self._perms, self._length).to_numpy()
+                column = vectorised(self._rows).tolist()
+            self._columns[idx] = column
+        return column
+
+
 class PermutationStatistic:
     """
     A class for checking preservation of statistics
@@ -44,6 +113,7 @@ class PermutationStatistic:
         ("Number of bounces", Perm.count_bounces),
         ("Maximum drop size", Perm.max_drop_size),
         ("Number of primes in the column sums", Perm.count_column_sum_primes),
+        # Exponential in the length in the worst case, see Perm.holeyness
         ("Holeyness of a permutation", Perm.holeyness),
         ("Number of stack-sorts needed", Perm.count_stack_sorts),
         ("Number of pop-stack-sorts needed", Perm.count_pop_stack_sorts),
@@ -93,8 +163,24 @@ class PermutationStatistic:
         """Return a distribution of statistic for a fixed length of permutations. If a
         class is not provided, we use the set of all permutations.
         """
-        iterator = perm_class.of_length(n) if perm_class else Perm.of_length(n)
-        cnt = Counter(self.func(p) for p in iterator)
+        func = _WRAPPED.get(self.func, self.func)
+        vectorised = _vectorised(self.func)
+        if (
+            perm_class is None
+            and StatisticsTracker.supports(func)
+            and (vectorised is None or n > _GRAY_CODE_MIN_LENGTH)
+        ):
+            cnt = Counter(val for val, in gray_code_values(n, (func,)))
+        elif vectorised is not None:
+            if perm_class is None:
+                perms = PermArray.of_length(n)
+            else:
+                perms = PermArray(perm_class.of_length(n), n)
+            counts = np.bincount(vectorised(perms.to_numpy()), minlength=1)
+            return cast(List[int], counts.tolist())
+        else:
+            iterator = perm_class.of_length(n) if perm_class else Perm.of_length(n)
+            cnt = Counter(self.func(p) for p in iterator)
         lis = [0] * (max(cnt.keys(), default=0) + 1)
         for key, val in cnt.items():
             lis[key] = val
@@ -124,6 +210,16 @@ class PermutationStatistic:
             )
         )
 
+    @staticmethod
+    def _values_by_length(perm_class: Av, n: int) -> List[_StatisticColumns]:
+        """For each length up to n, the values of the predefined statistics on
+        the perms of that length in the class, computed when first needed."""
+        funcs = [func for _, func in PermutationStatistic._STATISTICS]
+        return [
+            _StatisticColumns(funcs, list(perm_class.of_length(length)), length)
+            for length in range(n + 1)
+        ]
+
     @staticmethod
     def jointly_equally_distributed(
         class1: Av, class2: Av, n: int = 6, dim: int = 2
@@ -131,17 +227,16 @@ class PermutationStatistic:
         """Check if a combination of statistics is equally distributed between
         two classes up to a max length.
         """
+        stats = PermutationStatistic._STATISTICS
+        values1 = PermutationStatistic._values_by_length(class1, n)
+        values2 = PermutationStatistic._values_by_length(class2, n)
         return (
-            tuple(stat[0] for stat in stats)
-            for stats in combinations(PermutationStatistic._STATISTICS, dim)
+            tuple(stats[idx][0] for idx in indices)
+            for indices in combinations(range(len(stats)), dim)
             if all(
-                Counter(
-                    tuple(stat[1](p) for stat in stats) for p in class1.of_length(i)
-                )
-                == Counter(
-                    tuple(stat[1](p) for stat in stats) for p in class2.of_length(i)
-                )
-                for i in range(n + 1)
+                Counter(zip(*(vals1[idx] for idx in indices)))
+                == Counter(zip(*(vals2[idx] for idx in indices)))
+                for vals1, vals2 in zip(values1, values2)
             )
         )
 
@@ -152,19 +247,21 @@ class PermutationStatistic:
         """Check if a combination of statistics in one class is equally distributed
         to any combination of statistics in the other class, up to a max length.
         """
+        stats = PermutationStatistic._STATISTICS
+        values1 = PermutationStatistic._values_by_length(class1, n)
+        values2 = PermutationStatistic._values_by_length(class2, n)
         return (
-            (tuple(stat[0] for stat in stats1), tuple(stat[0] for stat in stats2))
-            for stats1, stats2 in combinations(
-                permutations(PermutationStatistic._STATISTICS, dim), 2
+            (
+                tuple(stats[idx][0] for idx in indices1),
+                tuple(stats[idx][0] for idx in indices2),
+            )
+            for indices1, indices2 in combinations(
+                permutations(range(len(stats)), dim), 2
             )
             if all(
-                Counter(
-                    tuple(stat[1](p) for stat in stats1) for p in class1.of_length(i)
-                )
-                == Counter(
-                    tuple(stat[1](p) for stat in stats2) for p in class2.of_length(i)
-                )
-                for i in range(n + 1)
+                Counter(zip(*(vals1[idx] for idx in indices1)))
+                == Counter(zip(*(vals2[idx] for idx in indices2)))
+                for vals1, vals2 in zip(values1, values2)
             )
         )
 
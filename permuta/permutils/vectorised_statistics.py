@@ -0,0 +1,225 @@
+import math
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from permuta.patterns import Perm
+
+# Each function takes a 2-D integer array with one perm in each row and returns
+# a 1-D array with the value of the statistic for each perm
+VectorisedStatistic = Callable[[Any], Any]
+
+
+def _zeros(perms: Any) -> Any:
+    return np.zeros(perms.shape[0], dtype=np.int64)
+
+
+def _as_int(perms: Any) -> Any:
+    return perms.astype(np.int64, copy=False)
+
+
+def count_inversions(perms: Any) -> Any:
+    """The number of inversions of each perm."""
+    res = _zeros(perms)
+    for idx in range(perms.shape[1]):
+        res += (perms[:, idx : idx + 1] > perms[:, idx + 1 :]).sum(axis=1)
+    return res
+
+
+def count_non_inversions(perms: Any) -> Any:
+    """The number of non-inversions of each perm."""
+    n = perms.shape[1]
+    return n * (n - 1) // 2 - count_inversions(perms)
+
+
+def _descent_mask(perms: Any) -> Any:
+    return perms[:, :-1] > perms[:, 1:]
+
+
+def count_descents(perms: Any) -> Any:
+    """The number of descents of each perm."""
+    return _descent_mask(perms).sum(axis=1, dtype=np.int64)
+
+
+def count_ascents(perms: Any) -> Any:
+    """The number of ascents of each perm."""
+    return (perms[:, :-1] < perms[:, 1:]).sum(axis=1, dtype=np.int64)
+
+
+def major_index(perms: Any) -> Any:
+    """The sum of the 1-based positions of the descents of each perm."""
+    weights = np.arange(1, max(perms.shape[1], 1), dtype=np.int64)
+    return _descent_mask(perms) @ weights
+
+
+def count_peaks(perms: Any) -> Any:
+    """The number of peaks of each perm."""
+    left, mid, right = perms[:, :-2], perms[:, 1:-1], perms[:, 2:]
+    return ((left < mid) & (mid > right)).sum(axis=1, dtype=np.int64)
+
+
+def count_valleys(perms: Any) -> Any:
+    """The number of valleys of each perm."""
+    left, mid, right = perms[:, :-2], perms[:, 1:-1], perms[:, 2:]
+    return ((left > mid) & (mid < right)).sum(axis=1, dtype=np.int64)
+
+
+def count_cycles(perms: Any) -> Any:
+    """The number of cycles of each perm, counted by their smallest elements.
+    After following each element n times, every element has seen the smallest
+    element of its cycle."""
+    count, n = perms.shape
+    rows = np.arange(count)[:, None]
+    current = np.broadcast_to(np.arange(n), perms.shape)
+    smallest = current
+    for _ in range(n):
+        current = perms[rows, current]
+        smallest = np.minimum(smallest, current)
+    return (smallest == np.arange(n)).sum(axis=1, dtype=np.int64)
+
+
+# Landau's function, the largest order of a perm of length n, is less than
+# exp(1.05313 * sqrt(n * log(n))), which fits in an int64 up to this length
+_MAX_INT64_ORDER_LENGTH = 256
+
+
+def order(perms: Any) -> Any:
+    """The order of each perm, the lcm of the lengths of its cycles. The length
+    of the cycle of an element is the first number of steps taking it back to
+    itself."""
+    count, n = perms.shape
+    rows = np.arange(count)[:, None]
+    start = np.arange(n)
+    current = np.broadcast_to(start, perms.shape)
+    lengths = np.zeros(perms.shape, dtype=np.int64)
+    for step in range(1, n + 1):
+        current = perms[rows, current]
+        lengths[(lengths == 0) & (current == start)] = step
+    if n > _MAX_INT64_ORDER_LENGTH:
+        return np.array([math.lcm(*row) for row in lengths.tolist()], dtype=object)
+    return np.lcm.reduce(lengths, axis=1, initial=1)
+
+
+def _count_records(perms: Any, accumulate: Any) -> Any:
+    if perms.shape[1] == 0:
+        return _zeros(perms)
+    records = accumulate(perms, axis=1)
+    return 1 + (records[:, 1:] != records[:, :-1]).sum(axis=1, dtype=np.int64)
+
+
+def count_ltrmin(perms: Any) -> Any:
+    """The number of left-to-right minima of each perm."""
+    return _count_records(perms, np.minimum.accumulate)
+
+
+def count_ltrmax(perms: Any) -> Any:
+    """The number of left-to-right maxima of each perm."""
+    return _count_records(perms, np.maximum.accumulate)
+
+
+def count_rtlmin(perms: Any) -> Any:
+    """The number of right-to-left minima of each perm."""
+    return _count_records(perms[:, ::-1], np.minimum.accumulate)
+
+
+def count_rtlmax(perms: Any) -> Any:
+    """The number of right-to-left maxima of each perm."""
+    return _count_records(perms[:, ::-1], np.maximum.accumulate)
+
+
+def count_fixed_points(perms: Any) -> Any:
+    """The number of fixed points of each perm."""
+    return (perms == np.arange(perms.shape[1])).sum(axis=1, dtype=np.int64)
+
+
+def _longest_run(ascending: Any) -> Any:
+    """The longest run of each row, given whether each adjacent pair ascends."""
+    count, pairs = ascending.shape
+    current = np.ones(count, dtype=np.int64)
+    longest = current.copy()
+    for idx in range(pairs):
+        current = np.where(ascending[:, idx], current + 1, 1)
+        np.maximum(longest, current, out=longest)
+    return longest
+
+
+def length_of_longestrun_ascending(perms: Any) -> Any:
+    """The length of the longest ascending run of each perm."""
+    if perms.shape[1] == 0:
+        return _zeros(perms)
+    return _longest_run(perms[:, :-1] < perms[:, 1:])
+
+
+def length_of_longestrun_descending(perms: Any) -> Any:
+    """The length of the longest descending run of each perm."""
+    if perms.shape[1] == 0:
+        return _zeros(perms)
+    return _longest_run(_descent_mask(perms))
+
+
+def depth(perms: Any) -> Any:
+    """The depth of each perm."""
+    drops = _as_int(perms) - np.arange(perms.shape[1])
+    return np.where(drops > 0, drops, 0).sum(axis=1)
+
+
+def max_drop_size(perms: Any) -> Any:
+    """The maximum drop size of each perm."""
+    if perms.shape[1] == 0:
+        return _zeros(perms)
+    return (_as_int(perms) - np.arange(perms.shape[1])).max(axis=1)
+
+
+def _images(perms: Any) -> Any:
+    """The image of the image of each index of each perm."""
+    return np.take_along_axis(perms, _as_int(perms), axis=1)
+
+
+def count_cyclic_peaks(perms: Any) -> Any:
+    """The number of cyclic peaks of each perm."""
+    idx = np.arange(perms.shape[1])
+    return ((idx < perms) & (perms > _images(perms))).sum(axis=1, dtype=np.int64)
+
+
+def count_cyclic_valleys(perms: Any) -> Any:
+    """The number of cyclic valleys of each perm."""
+    idx = np.arange(perms.shape[1])
+    return ((idx > perms) & (perms < _images(perms))).sum(axis=1, dtype=np.int64)
+
+
+def count_double_excedance(perms: Any) -> Any:
+    """The number of double excedances of each perm."""
+    idx = np.arange(perms.shape[1])
+    return ((idx < perms) & (perms < _images(perms))).sum(axis=1, dtype=np.int64)
+
+
+def count_double_drops(perms: Any) -> Any:
+    """The number of double drops of each perm."""
+    idx = np.arange(perms.shape[1])
+    return ((idx > perms) & (perms > _images(perms))).sum(axis=1, dtype=np.int64)
+
+
+VECTORISED_STATISTICS: Dict[Callable[[Perm], int], VectorisedStatistic] = {
+    Perm.count_inversions: count_inversions,
+    Perm.count_non_inversions: count_non_inversions,
+    Perm.major_index: major_index,
+    Perm.count_descents: count_descents,
+    Perm.count_ascents: count_ascents,
+    Perm.count_peaks: count_peaks,
+    Perm.count_valleys: count_valleys,
+    Perm.count_cycles: count_cycles,
+    Perm.order: order,
+    Perm.count_ltrmin: count_ltrmin,
+    Perm.count_ltrmax: count_ltrmax,
+    Perm.count_rtlmin: count_rtlmin,
+    Perm.count_rtlmax: count_rtlmax,
+    Perm.count_fixed_points: count_fixed_points,
+    Perm.length_of_longestrun_ascending: length_of_longestrun_ascending,
+    Perm.length_of_longestrun_descending: length_of_longestrun_descending,
+    Perm.depth: depth,
+    Perm.max_drop_size: max_drop_size,
+    Perm.count_cyclic_peaks: count_cyclic_peaks,
+    Perm.count_cyclic_valleys: count_cyclic_valleys,
+    Perm.count_double_excedance: count_double_excedance,
+    Perm.count_double_drops: count_double_drops,
+}
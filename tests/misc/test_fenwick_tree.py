@@ -0,0 +1,29 @@
+import random
+
+from permuta.misc.fenwick_tree import FenwickTree
+
+
+def test_fenwick_tree():
+    values = [random.randint(-10, 10) for _ in range(50)]
+    tree = FenwickTree(len(values))
+    assert len(tree) == 50
+    for idx, val in enumerate(values):
+        tree.add(idx, val)
+    for idx in range(len(values) + 1):
+        assert tree.prefix_sum(idx) == sum(values[:idx])
+    tree.add(10, 5)
+    tree.add(10)
+    assert tree.prefix_sum(10) == sum(values[:10])
+    assert tree.prefix_sum(11) == sum(values[:11]) + 6
+
+
+def test_fenwick_tree_from_list_and_find():
+    values = [random.randint(0, 3) for _ in range(37)]
+    tree = FenwickTree.from_list(values)
+    assert len(tree) == 37
+    for idx in range(len(values) + 1):
+        assert tree.prefix_sum(idx) == sum(values[:idx])
+    for k in range(sum(values)):
+        idx = tree.find(k)
+        assert sum(values[:idx]) <= k < sum(values[: idx + 1])
+    assert FenwickTree.from_list([]).find(0) == 0
@@ -0,0 +1,65 @@
+import collections
+import itertools
+import random
+
+from permuta import Perm
+from permuta.patterns.counting import count_occurrences, pattern_counts
+
+
+def _generic_count(patt, perm):
+    return sum(1 for _ in Perm(patt).occurrences_in(perm))
+
+
+def test_count_small_patterns_in_small_perms():
+    for length in range(5):
+        for patt in itertools.permutations(range(length)):
+            for perm in Perm.up_to_length(6):
+                assert count_occurrences(patt, perm) == _generic_count(patt, perm)
+
+
+def test_count_in_random_perms():
+    for _ in range(10):
+        perm = Perm.random(random.randint(7, 20))
+        for length in range(3, 5):
+            total = 0
+            for patt in itertools.permutations(range(length)):
+                count = count_occurrences(patt, perm)
+                assert count == _generic_count(patt, perm)
+                total += count
+            assert total == len(list(itertools.combinations(perm, length)))
+
+
+def test_count_monotone():
+    perm = Perm.random(30)
+    for length in range(5, 8):
+        for patt in (tuple(range(length)), tuple(range(length - 1, -1, -1))):
+            assert count_occurrences(patt, perm) == _generic_count(patt, perm)
+    assert count_occurrences(tuple(range(6)), Perm.identity(10)) == 210
+    assert count_occurrences((0, 2, 1, 3, 4), perm) is None
+
+
+def test_count_occurrences_in():
+    perm = Perm.random(15)
+    for patt in itertools.chain(Perm.of_length(4), Perm.of_length(5)):
+        assert patt.count_occurrences_in(perm) == _generic_count(patt, perm)
+        assert perm.count_occurrences_of(patt) == _generic_count(patt, perm)
+    assert Perm((0, 1)).count_occurrences_in(Perm((0,))) == 0
+
+
+def test_pattern_counts():
+    for perm in list(Perm.up_to_length(6)) + [Perm.random(12) for _ in range(5)]:
+        for length in range(5):
+            counts = pattern_counts(perm, length)
+            assert len(counts) == len(list(itertools.permutations(range(length))))
+            for patt, count in counts.items():
+                assert count == _generic_count(patt, perm)
+
+
+def test_threepats_and_fourpats():
+    perm = Perm.random(12)
+    for length, counts in ((3, perm.threepats()), (4, perm.fourpats())):
+        expected = collections.Counter(
+            Perm.to_standard(subseq) for subseq in itertools.combinations(perm, length)
+        )
+        assert counts == expected
+        assert all(count > 0 for count in counts.values())
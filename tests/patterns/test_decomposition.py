@@ -0,0 +1,94 @@
+import random
+
+from permuta import Perm
+from permuta.patterns.decomposition import decomposition_tree
+
+
+def _is_interval(perm, start, stop):
+    values = perm[start:stop]
+    return max(values) - min(values) == stop - start - 1
+
+
+def _has_proper_interval(perm):
+    n = len(perm)
+    for start in range(n):
+        low = high = perm[start]
+        for stop in range(start + 2, min(n, start + n - 1) + 1):
+            low, high = min(low, perm[stop - 1]), max(high, perm[stop - 1])
+            if high - low == stop - start - 1:
+                return True
+    return False
+
+
+def _check_tree(perm):
+    root = decomposition_tree(perm)
+    assert (root.start, root.stop) == (0, len(perm))
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        assert _is_interval(perm, node.start, node.stop)
+        assert node.low == min(perm[node.start : node.stop])
+        children = node.children
+        if node.kind == "leaf":
+            assert len(node) == 1 and not children
+            continue
+        assert children[0].start == node.start and children[-1].stop == node.stop
+        assert all(fst.stop == snd.start for fst, snd in zip(children, children[1:]))
+        skeleton = node.skeleton()
+        if node.kind == "increasing":
+            assert skeleton == tuple(range(len(children)))
+            assert all(child.kind != "increasing" for child in children)
+        elif node.kind == "decreasing":
+            assert skeleton == tuple(reversed(range(len(children))))
+            assert all(child.kind != "decreasing" for child in children)
+        else:
+            assert node.kind == "prime"
+            assert len(skeleton) >= 4 and not _has_proper_interval(skeleton)
+        nodes.extend(children)
+
+
+def test_decomposition_tree():
+    assert decomposition_tree(()) is None
+    assert decomposition_tree((0,)).kind == "leaf"
+    for length in range(1, 8):
+        for perm in Perm.of_length(length):
+            _check_tree(perm)
+    for _ in range(200):
+        perm = Perm.random(random.randint(8, 40))
+        _check_tree(perm)
+        _check_tree(perm.direct_sum(Perm.random(3), perm))
+        _check_tree(perm.skew_sum(perm.inverse()))
+
+
+def test_decompositions_agree_with_tree():
+    for _ in range(200):
+        perm = Perm.random(random.randint(1, 6)).direct_sum(
+            Perm.random(random.randint(1, 6)).skew_sum(Perm.random(3))
+        )
+        for perm in (perm, perm.reverse(), perm.inverse()):
+            root = perm.decomposition_tree()
+            components = [
+                Perm.to_standard(perm[child.start : child.stop])
+                for child in root.children
+            ]
+            expected = components if root.kind == "increasing" else [perm]
+            assert perm.sum_decomposition() == expected
+            expected = components if root.kind == "decreasing" else [perm]
+            assert perm.skew_decomposition() == expected
+
+
+def test_simplicity_of_long_perms():
+    for length in range(4, 40, 2):
+        # The parallel alternations 1 3 5 ... 0 2 4 ... are simple
+        perm = Perm(list(range(1, length, 2)) + list(range(0, length, 2)))
+        assert not _has_proper_interval(perm)
+        assert perm.is_simple()
+        assert perm.maximum_block() == (0, 0)
+    for _ in range(20):
+        perm = Perm.random(200)
+        assert perm.is_simple() == (not _has_proper_interval(perm))
+    perm = Perm(list(range(1, 5000, 2)) + list(range(0, 5000, 2)))
+    assert perm.is_simple()
+    inflated = Perm([val + (val > 4998) for val in perm[:-1]] + [4998, 4999])
+    assert not inflated.is_simple()
+    assert inflated.maximum_block() == (2, 4999)
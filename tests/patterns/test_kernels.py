@@ -0,0 +1,65 @@
+import itertools
+import random
+
+from permuta import Perm
+from permuta.patterns.kernels import KERNEL_MIN_LENGTH, containment_kernel
+
+
+def _generic_contains(patt, perm):
+    return any(True for _ in patt.occurrences_in(perm))
+
+
+def test_kernel_coverage():
+    missing = [
+        patt
+        for length in range(5)
+        for patt in itertools.permutations(range(length))
+        if containment_kernel(patt) is None
+    ]
+    assert missing == [(0, 2, 1, 3), (1, 3, 0, 2), (2, 0, 3, 1), (3, 1, 2, 0)]
+    assert containment_kernel((0, 1, 2, 3, 4)) is None
+
+
+def test_kernels_on_small_perms():
+    for length in range(5):
+        for patt in Perm.of_length(length):
+            kernel = containment_kernel(patt)
+            if kernel is None:
+                continue
+            for perm in Perm.up_to_length(6):
+                assert kernel(perm) == _generic_contains(patt, perm)
+
+
+def _merge_of_increasing(length):
+    """A random perm that is the union of two increasing subsequences."""
+    values = list(range(length))
+    random.shuffle(values)
+    first, second = sorted(values[: length // 2]), sorted(values[length // 2 :])
+    result = []
+    while first or second:
+        if first and (not second or random.random() < 0.5):
+            result.append(first.pop(0))
+        else:
+            result.append(second.pop(0))
+    return Perm(result)
+
+
+def test_kernels_on_long_perms():
+    for _ in range(20):
+        perm = _merge_of_increasing(random.randint(KERNEL_MIN_LENGTH, 60))
+        for patt in Perm.of_length(4):
+            kernel = containment_kernel(patt)
+            if kernel is not None:
+                assert kernel(perm) == _generic_contains(patt, perm)
+
+
+def test_dispatch():
+    perm = _merge_of_increasing(2000)
+    assert perm.avoids(Perm((0, 3, 2, 1)))
+    assert perm.avoids(Perm((2, 1, 0)), Perm((3, 2, 1, 0)))
+    assert Perm((3, 2, 1, 0)) not in perm
+    basis = (Perm((0, 2, 1, 3)), Perm((2, 1, 0)))
+    perm = _merge_of_increasing(40)
+    assert perm.avoids(*basis) == all(
+        not _generic_contains(patt, perm) for patt in basis
+    )
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from permuta import Perm
+from permuta.patterns.packed import (
+    pack,
+    packed_complement,
+    packed_hash,
+    packed_insert,
+    packed_inverse,
+    packed_length,
+    packed_remove,
+    packed_reverse,
+    unpack,
+)
+
+
+def _perms():
+    yield from Perm.up_to_length(6)
+    for _ in range(200):
+        yield Perm.random(random.randint(7, 16))
+
+
+def test_pack_and_unpack():
+    for perm in _perms():
+        code = perm.pack()
+        assert Perm.unpack(code) == perm
+        assert packed_length(code) == len(perm)
+    with pytest.raises(ValueError):
+        Perm.identity(17).pack()
+
+
+def test_symmetries():
+    for perm in _perms():
+        code = pack(perm)
+        assert unpack(packed_inverse(code)) == perm.inverse()
+        assert unpack(packed_reverse(code)) == perm.reverse()
+        assert unpack(packed_complement(code)) == perm.complement()
+
+
+def test_remove_and_insert():
+    for perm in _perms():
+        code = pack(perm)
+        for index in range(len(perm)):
+            assert Perm.unpack(packed_remove(code, index)) == perm.remove(index)
+        if len(perm) < 16:
+            for index in range(len(perm) + 1):
+                for new_element in range(len(perm) + 1):
+                    assert Perm.unpack(
+                        packed_insert(code, index, new_element)
+                    ) == perm.insert(index, new_element)
+    with pytest.raises(IndexError):
+        packed_remove(pack((0, 1)), 2)
+    with pytest.raises(ValueError):
+        packed_insert(pack(range(16)), 0, 0)
+
+
+def test_packed_hash():
+    hashes = {packed_hash(pack(perm)) for perm in Perm.of_length(7)}
+    assert len(hashes) == 5040
+    assert all(0 <= value < 1 << 64 for value in hashes)
@@ -0,0 +1,91 @@
+import random
+from itertools import combinations
+
+from permuta import BivincularPatt, MeshPatt, Perm
+from permuta.patterns.pattern_matcher import PatternMatcher
+
+
+def _random_patt(length):
+    kind = random.randrange(3)
+    if kind == 0:
+        return Perm.random(length)
+    if kind == 1:
+        return MeshPatt.random(length)
+    return BivincularPatt.random(length)
+
+
+def test_agrees_with_occurrences_in():
+    for _ in range(500):
+        patt = _random_patt(random.randint(0, 5))
+        matcher = patt.compile()
+        assert isinstance(matcher, PatternMatcher)
+        for _ in range(5):
+            perm = Perm.random(random.randint(0, 12))
+            occurrences = list(patt.occurrences_in(perm))
+            assert list(matcher.occurrences(perm)) == occurrences
+            assert matcher.first_occurrence(perm) == next(iter(occurrences), None)
+            assert matcher.contains(perm) == bool(occurrences)
+            assert matcher.avoided_by(perm) == (not occurrences)
+            assert matcher.count(perm) == len(occurrences)
+
+
+def test_long_perms():
+    for _ in range(50):
+        patt = Perm.random(random.randint(1, 5))
+        matcher = patt.compile()
+        perm = Perm.random(40)
+        assert matcher.contains(perm) == perm.contains(patt)
+        assert matcher.count(perm) == patt.count_occurrences_in(perm)
+
+
+def test_mesh_patterns_in_mesh_patterns():
+    for _ in range(100):
+        patt = MeshPatt.random(random.randint(0, 3))
+        other = MeshPatt.random(random.randint(0, 4))
+        matcher = patt.compile()
+        assert list(matcher.occurrences(other)) == list(patt.occurrences_in(other))
+        assert matcher.contains(other) == other.contains(patt)
+
+
+def test_empty_patterns():
+    assert Perm().compile().count(Perm((0, 1))) == 1
+    shaded = MeshPatt(Perm(), [(0, 0)]).compile()
+    assert shaded.contains(Perm())
+    assert not shaded.contains(Perm((0,)))
+
+
+def test_occurrences_brute_force():
+    for _ in range(300):
+        patt = Perm.random(random.randint(0, 4))
+        perm = Perm.random(random.randint(0, 9))
+        patt_colours = [random.randrange(2) for _ in patt]
+        perm_colours = [random.randrange(2) for _ in perm]
+        expected = [
+            indices
+            for indices in combinations(range(len(perm)), len(patt))
+            if Perm.to_standard(perm[idx] for idx in indices) == patt
+        ]
+        assert list(patt.occurrences_in(perm)) == expected
+        assert perm.contains(patt) == bool(expected)
+        assert list(patt.occurrences_in(perm, patt_colours, perm_colours)) == [
+            indices
+            for indices in expected
+            if [perm_colours[idx] for idx in indices] == patt_colours
+        ]
+
+
+def test_visit_occurrences_in():
+    patt, perm = Perm((0, 1)), Perm((0, 1, 2, 3))
+    found = []
+    assert patt.visit_occurrences_in(perm, lambda idx: found.append(tuple(idx))) == 6
+    assert found == list(patt.occurrences_in(perm))
+    found = []
+
+    def stop_at_third(indices):
+        found.append(tuple(indices))
+        return len(found) == 3
+
+    assert patt.visit_occurrences_in(perm, stop_at_third) == 3
+    assert found == list(patt.occurrences_in(perm))[:3]
+    matcher = MeshPatt(Perm((0, 1)), [(1, 1)]).compile()
+    assert matcher.visit(perm, lambda idx: None) == 3
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from permuta import Basis, MeshBasis, MeshPatt, Perm
+from permuta.patterns.pattern_trie import PatternTrie
+
+
+def test_empty_trie():
+    trie = PatternTrie()
+    assert len(trie) == 0
+    assert trie.avoided_by(Perm((0, 1, 2)))
+    assert trie.avoided_by(Perm())
+
+
+def test_empty_perm_in_trie():
+    trie = PatternTrie([Perm()])
+    assert trie.contained_in(Perm())
+    assert trie.contained_in(Perm((1, 0)))
+
+
+def test_add_and_iter():
+    patts = [Perm((0, 2, 1)), Perm((0, 2, 1, 3)), Perm((1, 0))]
+    trie = PatternTrie()
+    for patt in patts:
+        trie.add(patt)
+    assert list(trie) == patts
+    assert len(trie) == 3
+    with pytest.raises(TypeError):
+        trie.add((0, 1))
+
+
+def test_classical_agrees_with_avoids():
+    for _ in range(200):
+        patts = [Perm.random(random.randint(1, 5)) for _ in range(random.randint(1, 8))]
+        trie = PatternTrie(patts)
+        for _ in range(10):
+            perm = Perm.random(random.randint(0, 9))
+            expected = any(patt in perm for patt in patts)
+            assert trie.contained_in(perm) == expected
+
+
+def test_shared_prefixes():
+    patts = list(Perm.of_length(4))
+    trie = PatternTrie(patts)
+    assert all(trie.contained_in(perm) for perm in Perm.of_length(5))
+    trie = PatternTrie(p for p in patts if p != Perm((0, 1, 2, 3)))
+    assert trie.avoided_by(Perm((0, 1, 2, 3)))
+    assert trie.contained_in(Perm((0, 1, 3, 2)))
+
+
+def test_mesh_patterns_in_perms():
+    for _ in range(100):
+        patts = [MeshPatt.random(random.randint(1, 3)) for _ in range(3)]
+        patts.append(Perm.random(random.randint(2, 5)))
+        trie = PatternTrie(patts)
+        for _ in range(10):
+            perm = Perm.random(random.randint(0, 8))
+            expected = not perm.avoids(*patts)
+            assert trie.contained_in(perm) == expected
+
+
+def test_mesh_patterns_in_mesh_patterns():
+    for _ in range(100):
+        patts = [MeshPatt.random(random.randint(1, 3)) for _ in range(3)]
+        trie = PatternTrie(patts)
+        for _ in range(5):
+            mesh_patt = MeshPatt.random(random.randint(0, 5))
+            assert trie.contained_in(mesh_patt) == (not mesh_patt.avoids(*patts))
+
+
+def test_compile_is_cached():
+    patts = (Perm((0, 1, 2)), Perm((2, 1, 0)))
+    assert PatternTrie.compile(patts) is PatternTrie.compile(patts)
+
+
+def test_basis_compile():
+    basis = Basis.from_string("1324_4231_2413")
+    matcher = basis.compile()
+    assert list(matcher) == list(basis)
+    for perm in Perm.of_length(6):
+        assert matcher.avoided_by(perm) == perm.avoids(*basis)
+    mesh_basis = MeshBasis(Perm((0, 1)), MeshPatt(Perm((1, 0)), [(1, 1)]))
+    matcher = mesh_basis.compile()
+    for perm in Perm.of_length(5):
+        assert matcher.avoided_by(perm) == perm.avoids(*mesh_basis)
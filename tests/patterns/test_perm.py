@@ -1,4 +1,5 @@
 import itertools
+import pickle
 import random
 from collections import deque
 from math import factorial
@@ -107,6 +108,29 @@ def test_of_length():
     assert list(Perm.of_length(1)) == [Perm((0,))]
 
 
+def test_of_length_slices():
+    perms = list(Perm.of_length(5))
+    for start, stop in [(0, 120), (0, 7), (7, 120), (23, 97), (50, 51), (60, 60)]:
+        assert list(Perm.of_length(5, start, stop)) == perms[start:stop]
+    assert list(Perm.of_length(5, start_rank=100)) == perms[100:]
+    assert list(Perm.of_length(5, stop_rank=1000)) == perms
+    assert list(Perm.of_length(5, start_rank=200)) == []
+    for num_shards in (1, 3, 7, 200):
+        shards = [
+            list(Perm.of_length(5, shard=shard, num_shards=num_shards))
+            for shard in range(num_shards)
+        ]
+        assert sum(shards, []) == perms
+        assert max(map(len, shards)) - min(map(len, shards)) <= 1
+    shard = list(Perm.of_length(5, shard=1, num_shards=3))
+    assert list(Perm.of_length(5, start_rank=45, shard=1, num_shards=3)) == shard[5:]
+    assert next(Perm.of_length(14, start_rank=10**9)) == Perm.unrank(10**9, 14)
+    with pytest.raises(ValueError):
+        list(Perm.of_length(5, shard=3, num_shards=3))
+    with pytest.raises(ValueError):
+        list(Perm.of_length(5, start_rank=-1))
+
+
 def test_first():
     assert list(Perm.first(3)) == [Perm(()), Perm((0,)), Perm((0, 1))]
     assert list(Perm.first(0)) == []
@@ -209,6 +233,16 @@ def test_contained_in():
     assert not Perm([0, 1, 2, 3]).contained_in(Perm([4, 7, 5, 1, 6, 2, 3, 0]))
 
 
+def test_of_length_gray():
+    for length in range(8):
+        perms = list(Perm.of_length_gray(length))
+        assert sorted(perms) == list(Perm.of_length(length))
+        for perm, other in zip(perms, perms[1:]):
+            diff = [idx for idx in range(length) if perm[idx] != other[idx]]
+            assert len(diff) == 2 and diff[1] == diff[0] + 1
+        assert len(list(Perm.gray_swaps(length))) == len(perms) - 1
+
+
 def test_left_floor_and_ceiling():
     iterable = Perm([4, 5, 1, 2, 3, 6])
     expected = [
@@ -231,6 +265,21 @@ def test_left_floor_and_ceiling():
         assert fac == expected[index]
         index += 1
 
+    for _ in range(50):
+        perm = Perm.random(random.randint(0, 30))
+        expected = []
+        for idx, val in enumerate(perm):
+            left = perm[:idx]
+            lower = [other for other in left if other < val]
+            upper = [other for other in left if other > val]
+            expected.append(
+                (
+                    perm.index(max(lower)) if lower else -1,
+                    perm.index(min(upper)) if upper else -1,
+                )
+            )
+        assert list(perm.left_floor_and_ceiling()) == expected
+
     iterable = Perm([1, 2, 3])
     expected = [(-1, -1), (0, -1), (1, -1)]  # 1  # 2  # 3
     index = 0
@@ -1798,6 +1847,31 @@ def test_count_cycles():
     assert Perm((5, 3, 8, 1, 0, 4, 2, 7, 6)).count_cycles() == 4
 
 
+def test_cycle_type_and_power():
+    assert Perm().cycle_type() == ()
+    assert Perm().power(5) == Perm()
+    assert Perm((4, 2, 7, 0, 3, 1, 6, 5)).cycle_type() == (4, 3, 1)
+    for _ in range(100):
+        perm = Perm.random(random.randint(1, 20))
+        assert sum(perm.cycle_type()) == len(perm)
+        assert perm.power(0).is_identity()
+        assert perm.power(1) == perm
+        assert perm.power(-1) == perm.inverse()
+        assert perm.power(perm.order()).is_identity()
+        assert perm**3 == perm.compose(perm, perm)
+        assert perm.power(7).compose(perm.power(-3)) == perm.power(4)
+        assert perm.power(3).power(-2) == perm.power(-6)
+        other = Perm.random(len(perm))
+        conjugate = other.compose(perm, other.inverse())
+        assert conjugate.conjugacy_class_key() == perm.conjugacy_class_key()
+
+
+def test_cycle_index():
+    index = Perm.cycle_index(Perm.of_length(4))
+    assert index == {(1, 1, 1, 1): 1, (2, 1, 1): 6, (2, 2): 3, (3, 1): 8, (4,): 6}
+    assert Perm.cycle_index([]) == {}
+
+
 def test_is_involution():
     assert Perm().is_involution()
     assert Perm((0,)).is_involution()
@@ -1853,6 +1927,28 @@ def test_cycle_decomp():
 def test_rank():
     for i, perm in enumerate(Perm.first(1000)):
         assert perm.rank() == i
+    for _ in range(10):
+        perm = Perm.random(random.randint(50, 300))
+        assert Perm.unrank(perm.rank()) == perm
+        first_rank = Perm.identity(len(perm)).rank()
+        assert Perm.unrank(perm.rank() - first_rank, len(perm)) == perm
+
+
+def test_rank_many():
+    perms = list(Perm.first(200))
+    assert Perm.rank_many(perms) == list(range(200))
+    assert Perm.rank_many([]) == []
+    perms = [Perm.random(random.randint(0, 100)) for _ in range(50)]
+    assert Perm.rank_many(perms) == [perm.rank() for perm in perms]
+
+
+def test_unrank_range():
+    assert list(Perm.unrank_range(0, 1000)) == list(Perm.first(1000))
+    assert list(Perm.unrank_range(5, 5)) == []
+    assert list(Perm.unrank_range(30, 90, 5)) == list(Perm.of_length(5))[30:90]
+    assert list(Perm.unrank_range(0, 24, 4)) == list(Perm.of_length(4))
+    with pytest.raises(AssertionError):
+        list(Perm.unrank_range(0, 25, 4))
 
 
 def test_threepats():
@@ -2193,6 +2289,18 @@ def test_is_strongly_simple():
     assert Perm((4, 1, 6, 3, 0, 7, 2, 5)).is_strongly_simple()
 
 
+def test_simples_of_length():
+    for length in range(9):
+        assert list(Perm.simples_of_length(length)) == [
+            perm for perm in Perm.of_length(length) if perm.is_simple()
+        ]
+    assert sum(1 for _ in Perm.simples_of_length(9)) == 28146
+    keep = Perm((0, 1, 2)).avoided_by
+    assert list(Perm.simples_of_length(6, keep)) == [
+        perm for perm in Perm.of_length(6) if perm.is_simple() and keep(perm)
+    ]
+
+
 def test_coveredby():
     assert Perm().coveredby() == [Perm((0,))]
     assert sorted(Perm((0,)).coveredby()) == sorted([Perm((0, 1)), Perm((1, 0))])
@@ -2844,6 +2952,17 @@ def test_holeyness():
     assert Perm((0, 2, 5, 4, 3, 6, 1)).holeyness() == 2
     assert Perm((0, 3, 2, 1, 5, 6, 4)).holeyness() == 1
 
+    def runs(elements):
+        return sum(1 for x in elements if x + 1 not in elements)
+
+    for length in range(7):
+        for perm in Perm.of_length(length):
+            assert perm.holeyness() == max(
+                runs({perm[idx] for idx in subset}) - runs(set(subset))
+                for size in range(length + 1)
+                for subset in itertools.combinations(range(length), size)
+            )
+
 
 def test_count_stack_sorts():
     assert Perm(()).count_stack_sorts() == 0
@@ -3681,3 +3800,48 @@ def test_count_foreminima():
     assert Perm((3, 1, 2, 0)).count_foreminima() == 1
     assert Perm((3, 2, 0, 1)).count_foreminima() == 1
     assert Perm((3, 2, 1, 0)).count_foreminima() == 0
+
+
+def test_hash():
+    for _ in range(50):
+        perm = Perm.random(random.randint(0, 30))
+        assert hash(perm) == hash(tuple(perm)) == hash(perm)
+        assert hash(perm) == hash(Perm(perm))
+        copy = pickle.loads(pickle.dumps(perm))
+        assert copy == perm and hash(copy) == hash(perm)
+    assert len({Perm((0, 1)), Perm([0, 1]), Perm((1, 0))}) == 2
+
+
+def test_intern():
+    Perm.clear_interned()
+    perm = Perm((2, 0, 1)).intern()
+    assert Perm([2, 0, 1]).intern() is perm
+    assert perm.intern() is perm
+    assert Perm((0, 2, 1)).intern() is not perm
+    Perm.clear_interned()
+    assert Perm((2, 0, 1)).intern() is not perm
+    Perm.clear_interned()
+
+
+def test_no_instance_dict():
+    perm = Perm((1, 2, 0))
+    assert not hasattr(perm, "__dict__")
+    assert perm.count_cycles() == 1
+    assert Perm((0, 1)) in perm.inverse().insert(0, 3)
+
+
+def test_unpickle_perm_with_instance_dict():
+    # Pickled by a version of Perm that kept its caches in an instance dict
+    pickled = (
+        b"\x80\x02cpermuta.patterns.perm\nPerm\nq\x00K\x01K\x00\x86q\x01\x85q\x02"
+        b"\x81q\x03}q\x04X\x17\x00\x00\x00_cached_pattern_detailsq\x05]q\x06((J\xff"
+        b"\xff\xff\xffJ\xff\xff\xff\xffK\x01K\x01tq\x07(J\xff\xff\xff\xffK\x00K\x00"
+        b"K\x01tq\x08esb."
+    )
+    perm = pickle.loads(pickled)
+    assert perm == Perm((1, 0)) and type(perm) is Perm
+    assert not hasattr(perm, "__dict__")
+    assert perm in Perm((0, 2, 1))
+    perm = Perm((2, 0, 1))
+    perm.__setstate__({"_cached_hash": 5, "_cached_cycles": ((2, 1, 0),)})
+    assert perm == Perm((2, 0, 1)) and hash(perm) == hash((2, 0, 1))
@@ -0,0 +1,73 @@
+import pytest
+
+from permuta import Perm
+from permuta.patterns import PermArray, perm_array
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(perm_array, "np", None)
+    return request.param
+
+
+def test_construction_and_access():
+    perms = [Perm.random(7) for _ in range(20)]
+    arr = PermArray(perms)
+    assert len(arr) == 20
+    assert arr.length == 7
+    assert list(arr) == perms
+    assert arr[3] == perms[3]
+    assert arr[-1] == perms[-1]
+    with pytest.raises(IndexError):
+        arr[20]
+    with pytest.raises(ValueError):
+        PermArray([Perm((0, 1)), Perm((0,))])
+    assert list(PermArray([Perm(), Perm()])) == [Perm(), Perm()]
+    assert len(PermArray([], 5)) == 0
+    assert list(PermArray.of_length(0)) == [Perm()]
+    assert list(PermArray.of_length(4)) == list(Perm.of_length(4))
+    long_perm = Perm.random(300)
+    assert list(PermArray([long_perm])) == [long_perm]
+
+
+def test_slicing():
+    perms = list(Perm.of_length(4))
+    arr = PermArray(perms)
+    assert list(arr[5:10]) == perms[5:10]
+    assert list(arr[::3]) == perms[::3]
+    assert list(arr[10:5]) == []
+    assert list(arr[-3:][1:]) == perms[-2:]
+    assert arr[5:10] == PermArray(perms[5:10])
+
+
+def test_views_share_buffer():
+    numpy = pytest.importorskip("numpy")
+    arr = PermArray.of_length(4)
+    view = arr[6:12].to_numpy()
+    assert view.shape == (6, 4)
+    assert numpy.shares_memory(view, arr.to_numpy())
+    assert not view.flags.writeable
+
+
+def test_contains():
+    perms = [Perm.random(6) for _ in range(30)]
+    arr = PermArray(perms)
+    for perm in Perm.of_length(6):
+        assert (perm in arr) == (perm in perms)
+    assert Perm((0, 1)) not in arr
+    assert (0, 1, 2, 3, 4, 5) not in arr
+    assert arr.ranks() == [perm.rank() for perm in perms]
+
+
+def test_symmetries(backend):
+    perms = [Perm.random(5) for _ in range(25)]
+    arr = PermArray(perms)
+    assert list(arr.inverse()) == [perm.inverse() for perm in perms]
+    assert list(arr.reverse()) == [perm.reverse() for perm in perms]
+    assert list(arr.complement()) == [perm.complement() for perm in perms]
+    for times in range(-4, 5):
+        assert list(arr.rotate(times)) == [perm.rotate(times) for perm in perms]
+    assert list(PermArray.of_length(0).inverse()) == [Perm()]
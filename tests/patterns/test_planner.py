@@ -0,0 +1,47 @@
+import random
+from itertools import combinations
+
+from permuta import Perm
+from permuta.patterns.planner import embedding_order, plan_bounds, planned_contains
+
+
+def _contains(perm, patt):
+    return any(
+        Perm.to_standard(perm[idx] for idx in indices) == patt
+        for indices in combinations(range(len(perm)), len(patt))
+    )
+
+
+def test_embedding_order():
+    for length in range(7):
+        for patt in Perm.of_length(length):
+            assert sorted(embedding_order(patt)) == list(range(length))
+
+
+def test_planned_contains():
+    for _ in range(1000):
+        patt = Perm.random(random.randint(0, 6))
+        perm = Perm.random(random.randint(0, 10))
+        expected = _contains(perm, patt)
+        assert planned_contains(plan_bounds(patt, embedding_order(patt)), perm) == (
+            expected
+        )
+        order = list(range(len(patt)))
+        random.shuffle(order)
+        assert planned_contains(plan_bounds(patt, order), perm) == expected
+        assert perm.contains(patt) == expected
+
+
+def test_left_to_right_plan():
+    for length in range(6):
+        for patt in Perm.of_length(length):
+            bounds = plan_bounds(patt, range(length))
+            for (floor, ceiling, lbp, ubp), bound in zip(
+                patt._pattern_details(), bounds
+            ):
+                assert bound[4:] == (
+                    length if floor == -1 else floor,
+                    lbp + (floor == -1),
+                    length + 1 if ceiling == -1 else ceiling,
+                    ubp,
+                )
@@ -1,9 +1,10 @@
 from math import factorial
+from pathlib import Path
 
 import pytest
 
 from permuta import MeshPatt, Perm
-from permuta.perm_sets import Av
+from permuta.perm_sets import Av, LevelStore, TreeCounter, permset
 from permuta.perm_sets.basis import Basis, MeshBasis
 
 
@@ -291,3 +292,144 @@ def test_invalid_ops_with_mesh_patt():
         Av(MeshBasis(Perm((0, 1)))).is_insertion_encodable()
     with pytest.raises(NotImplementedError):
         Av(MeshBasis(Perm((0, 1)))).is_polynomial()
+    with pytest.raises(NotImplementedError):
+        Av(MeshBasis(Perm((0, 1)))).simples_of_length(5)
+
+
+def test_simples_of_length():
+    for basis in ("231", "2413", "321", "2413_3142", "4231_35142"):
+        av = Av.from_string(basis)
+        for length in range(8):
+            assert list(av.simples_of_length(length)) == sorted(
+                perm for perm in av.of_length(length) if perm.is_simple()
+            )
+
+
+def test_level_store(tmp_path):
+    bases = ["321", "2413_3142", "012_210", "4231"]
+    expected = {basis: Av.from_string(basis).enumeration(8) for basis in bases}
+    levels = {basis: set(Av.from_string(basis).of_length(7)) for basis in bases}
+    store = LevelStore(tmp_path)
+    Av.set_level_store(store)
+    try:
+        for length in (5, 8, 3, 8):
+            Av.clear_cache()
+            for basis in bases:
+                av = Av.from_string(basis)
+                assert av.count(length) == expected[basis][length]
+                assert av.enumeration(8) == expected[basis]
+                assert set(av.of_length(7)) == levels[basis]
+        basis = Av.from_string("321").basis
+        assert len(store.load(basis, 100)) == 8
+        (store._class_directory(basis) / "6.bin").write_bytes(b"\x00")
+        assert len(store.load(basis, 100)) == 6
+        Av.clear_cache()
+        assert Av.from_string("321").enumeration(8) == expected["321"]
+    finally:
+        Av.set_level_store(None)
+        Av.clear_cache()
+
+
+def test_level_store_reads_each_level_once(tmp_path, monkeypatch):
+    Av.clear_cache()
+    expected = Av.from_string("4231").enumeration(9)
+    store = LevelStore(tmp_path)
+    Av.set_level_store(store)
+    try:
+        Av.clear_cache()
+        Av.from_string("4231").count(7)
+        Av.clear_cache()
+        read = []
+        read_bytes = Path.read_bytes
+
+        def recording_read_bytes(path):
+            read.append(path.name)
+            return read_bytes(path)
+
+        monkeypatch.setattr(Path, "read_bytes", recording_read_bytes)
+        av = Av.from_string("4231")
+        assert [av.count(length) for length in range(10)] == expected
+        assert sorted(read) == [f"{level}.bin" for level in range(1, 7)]
+    finally:
+        Av.set_level_store(None)
+        Av.clear_cache()
+
+
+def test_parallel_levels(monkeypatch):
+    monkeypatch.setattr(permset, "_PARALLEL_MIN_LEVEL_SIZE", 10)
+    bases = ["4231", "2413_3142", "012_210", "1324_4321"]
+    Av.clear_cache()
+    expected = {
+        basis: [list(Av.from_string(basis).of_length(n)) for n in range(10)]
+        for basis in bases
+    }
+    Av.clear_cache()
+    Av.set_jobs(3)
+    try:
+        for basis in bases:
+            av = Av.from_string(basis)
+            assert [list(av.of_length(n)) for n in range(10)] == expected[basis]
+    finally:
+        Av.set_jobs(1)
+        Av.clear_cache()
+    with pytest.raises(ValueError):
+        Av.set_jobs(0)
+
+
+@pytest.mark.parametrize("cls,enum", test_classes)
+def test_count_only(cls, enum):
+    Av.clear_cache()
+    basis = Basis(*[Perm(p) for p in cls])
+    assert Av(basis).enumeration(len(enum) - 1, count_only=True) == enum
+    assert len(Av(basis).cache) == 1
+    counter = TreeCounter(basis, len(enum) - 1)
+    while not counter.run(max_nodes=5):
+        counter = TreeCounter(basis, len(enum) - 1, counter.frontier)
+    assert counter.total == enum[-1] and counter.frontier is None
+    with pytest.raises(NotImplementedError):
+        Av(MeshBasis(MeshPatt(Perm((0, 1)), [(1, 1)]))).count(3, count_only=True)
+    with pytest.raises(ValueError):
+        TreeCounter(basis, 3, (0, (1, 1, 1, 1)))
+
+
+@pytest.mark.parametrize("cls,enum", test_classes)
+def test_iter_length(cls, enum):
+    Av.clear_cache()
+    basis = Basis(*[Perm(p) for p in cls])
+    streamed = [sorted(Av(basis).iter_length(n)) for n in range(len(enum))]
+    assert len(Av(basis).cache) == 1
+    assert streamed == [sorted(Av(basis).of_length(n)) for n in range(len(enum))]
+    assert list(Av(basis).iter_length(4)) == list(Av(basis).of_length(4))
+    assert list(Av(basis).iter_length(len(enum), store=True)) == list(
+        Av(basis).of_length(len(enum))
+    )
+    mesh_basis = MeshBasis(MeshPatt(Perm((0, 1)), [(1, 1)]))
+    assert sorted(Av(mesh_basis).iter_length(4)) == sorted(Av(mesh_basis).of_length(4))
+
+
+def test_contains_long_perm():
+    Av.clear_cache()
+    av = Av.from_string("1324")
+    assert Perm(range(29, -1, -1)) in av
+    assert Perm((0, 2, 1, 3) + tuple(range(4, 30))) not in av
+    assert Perm.from_string("3012") in av
+    assert len(av.cache) == 5
+    perms = [Perm.unrank(rank, 9) for rank in range(0, factorial(9), 37)]
+    members = [perm in av for perm in perms]
+    assert len(av.cache) == 5
+    level = set(av.of_length(9))
+    assert members == [perm in level for perm in perms]
+    mesh_av = Av(MeshBasis(MeshPatt(Perm((0, 1)), [(1, 1)])))
+    matcher = mesh_av.basis.compile()
+    assert all((perm in mesh_av) == matcher.avoided_by(perm) for perm in perms)
+    assert len(mesh_av.cache) == 1
+    Av.clear_cache()
+
+
+def test_tree_counter_resume_at_dead_ends():
+    basis = Basis.from_string("012_210")
+    counter = TreeCounter(basis, 5)
+    assert not counter.run(max_nodes=1)
+    while not counter.run(max_nodes=1):
+        counter = TreeCounter(basis, 5, counter.frontier)
+    assert counter.total == 0 and counter.frontier is None
@@ -1,4 +1,14 @@
-from permuta import Av
+import random
+
+import pytest
+
+from permuta import Av, Perm
+from permuta.permutils import statistics
+from permuta.permutils.incremental_statistics import (
+    INCREMENTAL_STATISTICS,
+    StatisticsTracker,
+    gray_code_values,
+)
 from permuta.permutils.statistics import PermutationStatistic
 
 
@@ -174,3 +184,100 @@ def test_distribution_av():
         2036,
         1,
     ]
+
+
+def test_vectorised_statistics():
+    pytest.importorskip("numpy")
+    from permuta.patterns import PermArray
+    from permuta.permutils.vectorised_statistics import VECTORISED_STATISTICS
+
+    for n in range(8):
+        perms = list(Perm.of_length(n)) + [Perm.random(n) for _ in range(20)]
+        rows = PermArray(perms, n).to_numpy()
+        for func, vectorised in VECTORISED_STATISTICS.items():
+            assert vectorised(rows).tolist() == [func(perm) for perm in perms]
+    perms = [Perm.random(40) for _ in range(20)]
+    rows = PermArray(perms, 40).to_numpy()
+    for func, vectorised in VECTORISED_STATISTICS.items():
+        assert vectorised(rows).tolist() == [func(perm) for perm in perms]
+
+
+def test_distribution_without_numpy(monkeypatch):
+    basis = Av.from_string("132")
+    expected = [
+        PermutationStatistic(name, func).distribution_for_length(6, basis)
+        for name, func in PermutationStatistic._STATISTICS
+    ]
+    joint = list(PermutationStatistic.jointly_equally_distributed(basis, basis, 4))
+    monkeypatch.setattr(statistics, "VECTORISED_STATISTICS", {})
+    assert expected == [
+        PermutationStatistic(name, func).distribution_for_length(6, basis)
+        for name, func in PermutationStatistic._STATISTICS
+    ]
+    assert joint == list(
+        PermutationStatistic.jointly_equally_distributed(basis, basis, 4)
+    )
+
+
+def test_statistics_tracker():
+    funcs = list(INCREMENTAL_STATISTICS)
+    for n in range(7):
+        perms = list(Perm.of_length_gray(n))
+        assert list(gray_code_values(n, funcs)) == [
+            tuple(func(perm) for func in funcs) for perm in perms
+        ]
+    for _ in range(50):
+        perm = Perm.random(random.randint(2, 30))
+        tracker = StatisticsTracker(perm, funcs)
+        entries = list(perm)
+        for _ in range(20):
+            idx = random.randrange(len(perm) - 1)
+            tracker.swap(idx)
+            entries[idx], entries[idx + 1] = entries[idx + 1], entries[idx]
+            assert tracker.perm() == Perm(entries)
+            assert tracker.values == [func(Perm(entries)) for func in funcs]
+    with pytest.raises(ValueError):
+        StatisticsTracker(Perm((0, 1)), (Perm.count_cycles,))
+
+
+def test_distribution_by_gray_code(monkeypatch):
+    stats = [
+        PermutationStatistic(name, func)
+        for name, func in PermutationStatistic._STATISTICS
+        if StatisticsTracker.supports(statistics._WRAPPED.get(func, func))
+    ]
+    expected = [stat.distribution_up_to(6) for stat in stats]
+    monkeypatch.setattr(statistics, "_GRAY_CODE_MIN_LENGTH", 0)
+    assert [stat.distribution_up_to(6) for stat in stats] == expected
+    monkeypatch.setattr(statistics, "VECTORISED_STATISTICS", {})
+    assert [stat.distribution_up_to(6) for stat in stats] == expected
+
+
+def test_joint_distribution_is_lazy(monkeypatch):
+    lengths = []
+
+    def recorded_holeyness(perm):
+        lengths.append(len(perm))
+        return perm.holeyness()
+
+    monkeypatch.setattr(
+        PermutationStatistic,
+        "_STATISTICS",
+        (
+            ("Number of inversions", Perm.count_inversions),
+            ("Major index", Perm.major_index),
+            ("Holeyness of a permutation", recorded_holeyness),
+        ),
+    )
+    # The classes differ at length 1, so no longer perms are needed
+    class1, class2 = Av.from_string("0"), Av.from_string("01")
+    for dim in (1, 2):
+        assert not list(
+            PermutationStatistic.jointly_equally_distributed(class1, class2, 6, dim)
+        )
+        assert not list(
+            PermutationStatistic.jointly_transformed_equally_distributed(
+                class1, class2, 6, dim
+            )
+        )
+    assert max(lengths) == 1